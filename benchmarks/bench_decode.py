@@ -0,0 +1,95 @@
+"""
+Compare ways of decoding the recorded 8 zone payloads in benchmarks/fixtures.
+
+For each payload, reports the time to decode it:
+- str: decoding the body to a string first, as the client does without orjson
+- bytes: the standard library decoding the body directly
+- orjson: orjson decoding the body directly, if it is installed
+- extract: the client's decoder, then keeping only the parts of the config used
+and the memory held by the payload decoded by the client's decoder, whole and
+once extracted, so that the saving comes from the extraction alone.
+
+Usage: python benchmarks/bench_decode.py [--number 200] [--json]
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from custom_components.infinitude.infinitude import (  # noqa: E402
+    PATH_CONFIG,
+    PATH_ENERGY,
+    PATH_STATUS,
+    decode_json,
+    extract_config,
+    orjson,
+)
+
+from fake_infinitude import FakeInfinitude  # noqa: E402
+
+
+def held(decode):
+    """Bytes still allocated once decode has returned"""
+    gc.collect()
+    tracemalloc.start()
+    payload = decode()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del payload
+    return size
+
+
+def measure(path, raw, number):
+    decoders = {
+        "str": lambda: json.loads(raw.decode()),
+        "bytes": lambda: json.loads(raw),
+    }
+    if orjson is not None:
+        decoders["orjson"] = lambda: orjson.loads(raw)
+    if path == PATH_CONFIG:
+        decoders["extract"] = lambda: extract_config(decode_json(raw))
+
+    result = {"path": path, "kib": len(raw) / 1024}
+    for name, decode in decoders.items():
+        result["{}_us".format(name)] = (
+            min(timeit.repeat(decode, number=number, repeat=5)) / number * 1e6
+        )
+    result["held_kib"] = held(lambda: decode_json(raw)) / 1024
+    if path == PATH_CONFIG:
+        result["extracted_kib"] = held(decoders["extract"]) / 1024
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--number", type=int, default=200, help="decodes per timing")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    server = FakeInfinitude(zones=8)
+    results = [
+        measure(path, server.body(path), args.number)
+        for path in (PATH_STATUS, PATH_CONFIG, PATH_ENERGY)
+    ]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for result in results:
+        print(
+            "  ".join(
+                "{}={}".format(
+                    key, value if isinstance(value, str) else round(value, 1)
+                )
+                for key, value in result.items()
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Benchmark the poll cycle against a fake Infinitude server, for 1 to 8 zones.
+
+For each zone count, reports:
+- requests sent to Infinitude per poll cycle
+- wall time of a poll cycle (fetch and parse), median and 95th percentile
+- CPU time spent decoding and parsing the payloads into a snapshot
+- memory held by the decoded payloads and snapshot, in total and for each
+  zone added to a single zone system
+
+Usage: python benchmarks/bench_poll.py [--latency 0.05] [--cycles 50] [--json]
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+import aiohttp
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from custom_components.infinitude.infinitude import (  # noqa: E402
+    PATH_CONFIG,
+    PATH_ENERGY,
+    PATH_STATUS,
+    Infinitude,
+    decode_json,
+    extract_config,
+)
+from custom_components.infinitude.snapshot import SystemSnapshot  # noqa: E402
+
+from fake_infinitude import FakeInfinitude  # noqa: E402
+
+ZONE_COUNTS = (1, 2, 4, 8)
+
+# Default refresh intervals of the integration, in seconds
+REFRESH_INTERVALS = {PATH_CONFIG: 300, PATH_ENERGY: 3600}
+
+
+def decode(bodies):
+    """Decode the payloads the way the client does"""
+    status, config, energy = (decode_json(body) for body in bodies)
+    return status, extract_config(config)["data"], energy
+
+
+def measure_parse(server, repeat=20):
+    """CPU time to decode and parse one set of payloads, and the memory they
+    hold once parsed"""
+    bodies = [server.body(path) for path in (PATH_STATUS, PATH_CONFIG, PATH_ENERGY)]
+
+    start = time.process_time()
+    for _ in range(repeat):
+        SystemSnapshot.parse(*decode(bodies))
+    cpu = (time.process_time() - start) / repeat
+
+    gc.collect()
+    tracemalloc.start()
+    snapshot = SystemSnapshot.parse(*decode(bodies))
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del snapshot
+    return cpu, held
+
+
+async def measure_polls(server, cycles):
+    """Run poll cycles the way the coordinator does, returning the number of
+    requests per cycle and the wall time of each cycle"""
+    port = await server.start()
+    try:
+        async with aiohttp.ClientSession() as session:
+            infinitude = Infinitude(
+                session, "127.0.0.1", port, refresh_intervals=REFRESH_INTERVALS
+            )
+            payloads = None
+            snapshot = None
+            durations = []
+            for _ in range(cycles):
+                start = time.perf_counter()
+                fetched = await infinitude.async_fetch()
+                if fetched is not payloads:
+                    payloads = fetched
+                    snapshot = SystemSnapshot.parse(
+                        payloads["status"],
+                        payloads["config"],
+                        payloads["energy"],
+                        snapshot,
+                    )
+                durations.append(time.perf_counter() - start)
+    finally:
+        await server.stop()
+    return sum(server.requests.values()) / cycles, durations
+
+
+async def run(args):
+    results = []
+    single_zone = None
+    for zones in ZONE_COUNTS:
+        server = FakeInfinitude(zones, args.latency, churn=True)
+        parse_cpu, held = measure_parse(server)
+        requests, durations = await measure_polls(server, args.cycles)
+        durations.sort()
+        if zones == 1:
+            single_zone = held
+        results.append(
+            {
+                "zones": zones,
+                "requests_per_cycle": requests,
+                "cycle_ms_p50": statistics.median(durations) * 1000,
+                "cycle_ms_p95": durations[int(len(durations) * 0.95) - 1] * 1000,
+                "parse_cpu_ms": parse_cpu * 1000,
+                "kib": held / 1024,
+                # The system and its first zone cannot be told apart
+                "kib_per_added_zone": (
+                    (held - single_zone) / (zones - 1) / 1024 if zones > 1 else None
+                ),
+            }
+        )
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    columns = list(results[0])
+    print("".join("{:>20}".format(column) for column in columns))
+    for result in results:
+        print(
+            "".join(
+                "{:>20}".format(
+                    result[c]
+                    if isinstance(result[c], int)
+                    else "-"
+                    if result[c] is None
+                    else round(result[c], 2)
+                )
+                for c in columns
+            )
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="injected latency in seconds"
+    )
+    parser.add_argument("--cycles", type=int, default=50, help="poll cycles per run")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Compare the compiled weekly schedule lookup with the original per-poll loop
+over the zone program.
+
+Usage: python benchmarks/bench_schedule.py
+"""
+import datetime
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from custom_components.infinitude.schedule import DAYS, WeeklySchedule  # noqa: E402
+
+# Local times spread over a week, at the thermostat's one second resolution
+TIMES = [
+    datetime.datetime(2024, 1, 1) + datetime.timedelta(minutes=37 * i, seconds=i % 60)
+    for i in range(273)
+]
+
+
+def make_program(enabled_days):
+    """A program with the usual 5 periods a day, only enabled on some days"""
+    periods = [
+        ("06:00", "wake"),
+        ("08:00", "away"),
+        ("17:00", "home"),
+        ("22:00", "sleep"),
+        ("23:45", "sleep"),
+    ]
+    return {
+        "day": [
+            {
+                "id": day,
+                "period": [
+                    {
+                        "id": str(i + 1),
+                        "activity": [activity],
+                        "time": [time],
+                        "enabled": ["on" if day in enabled_days else "off"],
+                    }
+                    for i, (time, activity) in enumerate(periods)
+                ],
+            }
+            for day in DAYS
+        ]
+    }
+
+
+def loop_lookup(program, dt):
+    """The schedule lookup as previously run on every poll"""
+    activity_scheduled = None
+    activity_scheduled_start = None
+    activity_next = None
+    activity_next_start = None
+    while activity_next is None:
+        day_name = dt.strftime("%A")
+        day_program = next((day for day in program["day"] if day["id"] == day_name))
+        for period in day_program["period"]:
+            if period["enabled"][0] == "off":
+                continue
+            period_hh, period_mm = period["time"][0].split(":")
+            period_datetime = datetime.datetime(
+                dt.year, dt.month, dt.day, int(period_hh), int(period_mm)
+            )
+            if period_datetime < dt:
+                activity_scheduled = period["activity"][0]
+                activity_scheduled_start = period_datetime
+            if period_datetime >= dt:
+                activity_next = period["activity"][0]
+                activity_next_start = period_datetime
+                break
+        dt = datetime.datetime(
+            year=dt.year, month=dt.month, day=dt.day
+        ) + datetime.timedelta(days=1)
+    return (
+        activity_scheduled,
+        activity_scheduled_start,
+        activity_next,
+        activity_next_start,
+    )
+
+
+def check(program, schedule):
+    """The next activity must always match.  The scheduled activity must match
+    whenever the old loop found one, which it only did on the current day."""
+    for dt in TIMES:
+        old = loop_lookup(program, dt)
+        new = schedule.lookup(dt)
+        assert old[2:] == new[2:], (dt, old, new)
+        if old[0] is not None:
+            assert old[:2] == new[:2], (dt, old, new)
+
+
+def main():
+    cases = [
+        ("daily", DAYS),
+        ("weekdays", DAYS[:5]),
+        ("sparse (Sunday only)", DAYS[6:]),
+    ]
+    number = 20
+    print(
+        "{:<22}{:>14}{:>14}{:>14}".format(
+            "program", "loop us", "index us", "compile us"
+        )
+    )
+    for name, enabled_days in cases:
+        program = make_program(enabled_days)
+        schedule = WeeklySchedule(program)
+        check(program, schedule)
+
+        lookups = number * len(TIMES)
+        loop_time = timeit.timeit(
+            lambda: [loop_lookup(program, dt) for dt in TIMES], number=number
+        )
+        index_time = timeit.timeit(
+            lambda: [schedule.lookup(dt) for dt in TIMES], number=number
+        )
+        compile_time = timeit.timeit(lambda: WeeklySchedule(program), number=number)
+        print(
+            "{:<22}{:>14.2f}{:>14.2f}{:>14.2f}".format(
+                name,
+                loop_time / lookups * 1e6,
+                index_time / lookups * 1e6,
+                compile_time / number * 1e6,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
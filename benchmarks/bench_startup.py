@@ -0,0 +1,119 @@
+"""
+Benchmark the time until zone entities can be registered at startup, against
+a fake Infinitude server, for 1 to 8 zones.
+
+For each zone count, reports in milliseconds:
+- discovery: the single status request made before registering entities
+- first_refresh: the full refresh that then completes in the background
+- blocking: registering only after a full refresh, as setup used to
+- legacy: the original setup, requesting status, then status, config and
+  energy one after the other for each zone
+
+Usage: python benchmarks/bench_startup.py [--latency 0.05] [--runs 10] [--json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+import aiohttp
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from custom_components.infinitude.infinitude import (  # noqa: E402
+    PATH_CONFIG,
+    PATH_ENERGY,
+    PATH_STATUS,
+    Infinitude,
+)
+from custom_components.infinitude.snapshot import SystemSnapshot  # noqa: E402
+
+from fake_infinitude import FakeInfinitude  # noqa: E402
+
+ZONE_COUNTS = (1, 2, 4, 8)
+
+
+async def timed(coro):
+    start = time.perf_counter()
+    await coro
+    return time.perf_counter() - start
+
+
+async def full_refresh(infinitude):
+    payloads = await infinitude.async_fetch()
+    SystemSnapshot.parse(payloads["status"], payloads["config"], payloads["energy"])
+
+
+async def legacy_setup(infinitude, zones):
+    await infinitude.api(PATH_STATUS)
+    for _ in range(zones):
+        for path in (PATH_STATUS, PATH_CONFIG, PATH_ENERGY):
+            await infinitude.api(path)
+
+
+async def measure_startup(zones, args):
+    """Median time of each way to start, over fresh clients"""
+    server = FakeInfinitude(zones, args.latency)
+    port = await server.start()
+    timings = {"discovery": [], "first_refresh": [], "blocking": [], "legacy": []}
+    try:
+        for _ in range(args.runs):
+            # Each run starts with a new session, like Home Assistant does
+            async with aiohttp.ClientSession() as session:
+                infinitude = Infinitude(session, "127.0.0.1", port)
+                timings["discovery"].append(
+                    await timed(infinitude.async_status(retry=False))
+                )
+                timings["first_refresh"].append(await timed(full_refresh(infinitude)))
+            async with aiohttp.ClientSession() as session:
+                infinitude = Infinitude(session, "127.0.0.1", port)
+                timings["blocking"].append(await timed(full_refresh(infinitude)))
+            async with aiohttp.ClientSession() as session:
+                infinitude = Infinitude(session, "127.0.0.1", port)
+                timings["legacy"].append(await timed(legacy_setup(infinitude, zones)))
+    finally:
+        await server.stop()
+    return {
+        "{}_ms".format(name): statistics.median(durations) * 1000
+        for name, durations in timings.items()
+    }
+
+
+async def run(args):
+    results = []
+    for zones in ZONE_COUNTS:
+        result = {"zones": zones}
+        result.update(await measure_startup(zones, args))
+        results.append(result)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    columns = list(results[0])
+    print("".join("{:>20}".format(column) for column in columns))
+    for result in results:
+        print(
+            "".join(
+                "{:>20}".format(
+                    result[c] if isinstance(result[c], int) else round(result[c], 2)
+                )
+                for c in columns
+            )
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="injected latency in seconds"
+    )
+    parser.add_argument("--runs", type=int, default=10, help="startups per zone count")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
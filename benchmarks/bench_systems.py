@@ -0,0 +1,146 @@
+"""
+Benchmark poll cycles of 1 to 8 Infinitude systems against fake servers.
+
+Each system is polled by its own client, and all clients share the semaphore
+that caps the requests in flight, as they do in Home Assistant.  For each
+system count, reports the wall time of a cycle polling every system, with the
+systems polled concurrently and, for comparison, one after the other.
+
+Usage: python benchmarks/bench_systems.py [--latency 0.05] [--cycles 20] [--json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+import aiohttp
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from custom_components.infinitude.infinitude import (  # noqa: E402
+    MAX_CONCURRENT_REQUESTS,
+    PATH_CONFIG,
+    PATH_ENERGY,
+    Infinitude,
+)
+from custom_components.infinitude.snapshot import SystemSnapshot  # noqa: E402
+
+from fake_infinitude import FakeInfinitude  # noqa: E402
+
+SYSTEM_COUNTS = (1, 2, 4, 8)
+
+# Default refresh intervals of the integration, in seconds
+REFRESH_INTERVALS = {PATH_CONFIG: 300, PATH_ENERGY: 3600}
+
+
+class System:
+    """A client and the last snapshot parsed from it, like a coordinator"""
+
+    def __init__(self, infinitude):
+        self.infinitude = infinitude
+        self.payloads = None
+        self.snapshot = None
+
+    async def poll(self):
+        payloads = await self.infinitude.async_fetch()
+        if payloads is not self.payloads:
+            self.payloads = payloads
+            self.snapshot = SystemSnapshot.parse(
+                payloads["status"],
+                payloads["config"],
+                payloads["energy"],
+                self.snapshot,
+            )
+
+
+async def measure_cycles(count, args):
+    """Wall time of each cycle polling count systems, concurrently then serially"""
+    servers = [FakeInfinitude(8, args.latency, churn=True) for _ in range(count)]
+    ports = [await server.start() for server in servers]
+    semaphore = asyncio.Semaphore(args.cap)
+    try:
+        async with aiohttp.ClientSession() as session:
+            systems = [
+                System(
+                    Infinitude(
+                        session,
+                        "127.0.0.1",
+                        port,
+                        refresh_intervals=REFRESH_INTERVALS,
+                        semaphore=semaphore,
+                    )
+                )
+                for port in ports
+            ]
+            concurrent = []
+            for _ in range(args.cycles):
+                start = time.perf_counter()
+                await asyncio.gather(*(system.poll() for system in systems))
+                concurrent.append(time.perf_counter() - start)
+            serial = []
+            for _ in range(args.cycles):
+                start = time.perf_counter()
+                for system in systems:
+                    await system.poll()
+                serial.append(time.perf_counter() - start)
+    finally:
+        for server in servers:
+            await server.stop()
+    return concurrent, serial
+
+
+def percentile(durations, fraction):
+    durations = sorted(durations)
+    return durations[max(int(len(durations) * fraction) - 1, 0)]
+
+
+async def run(args):
+    results = []
+    for count in SYSTEM_COUNTS:
+        concurrent, serial = await measure_cycles(count, args)
+        results.append(
+            {
+                "systems": count,
+                "concurrent_ms_p50": statistics.median(concurrent) * 1000,
+                "concurrent_ms_p95": percentile(concurrent, 0.95) * 1000,
+                "serial_ms_p50": statistics.median(serial) * 1000,
+            }
+        )
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    columns = list(results[0])
+    print("".join("{:>20}".format(column) for column in columns))
+    for result in results:
+        print(
+            "".join(
+                "{:>20}".format(
+                    result[c] if isinstance(result[c], int) else round(result[c], 2)
+                )
+                for c in columns
+            )
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="injected latency in seconds"
+    )
+    parser.add_argument("--cycles", type=int, default=20, help="poll cycles per run")
+    parser.add_argument(
+        "--cap",
+        type=int,
+        default=MAX_CONCURRENT_REQUESTS,
+        help="requests in flight across all systems",
+    )
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Local stand-in for an Infinitude server, serving the recorded payloads in
+benchmarks/fixtures for 1 to 8 zones, with optional injected latency.
+
+Run on its own to point Home Assistant at it:
+
+    python benchmarks/fake_infinitude.py --zones 4 --latency 0.2 --port 3000
+"""
+import argparse
+import asyncio
+import collections
+import datetime
+import json
+import os
+import sys
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from custom_components.infinitude.infinitude import (  # noqa: E402
+    PATH_CONFIG,
+    PATH_ENERGY,
+    PATH_STATUS,
+)
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name)) as fixture:
+        return json.load(fixture)
+
+
+class FakeInfinitude:
+    """Serve /api/status, /api/config and its objects and /energy.json, and
+    apply config POSTs.
+
+    latency is added to every response, in seconds.  With churn, every status
+    request advances the thermostat clock by a minute, so that each poll sees
+    a new payload like it would from a busy system.  POSTed values of the keys
+    in ignored_keys are accepted but not applied, like settings the thermostat
+    overrides.
+
+    Config objects are looked up and changed independently of the client's
+    own helpers, so that its confirmations are checked against a separate
+    implementation.
+    """
+
+    def __init__(self, zones=8, latency=0.0, churn=False, ignored_keys=()):
+        self.latency = latency
+        self.churn = churn
+        self.ignored_keys = set(ignored_keys)
+        self.status = load_fixture("status.json")
+        self.config = load_fixture("config.json")
+        self.energy = load_fixture("energy.json")
+
+        # The fixtures hold 8 zones, only the requested number are served
+        for payload in (self.status, self.config["data"]):
+            reported = payload["zones"][0]
+            reported["zone"] = [
+                zone for zone in reported["zone"] if int(zone["id"]) <= zones
+            ]
+
+        # Number of requests served, by (method, path)
+        self.requests = collections.Counter()
+
+        self._bodies = {}
+        self._runner = None
+
+    def body(self, path):
+        """Serialized response of an endpoint, cached until it changes"""
+        if path not in self._bodies:
+            payload = {
+                PATH_STATUS: self.status,
+                PATH_CONFIG: self.config,
+                PATH_ENERGY: self.energy,
+            }[path]
+            self._bodies[path] = json.dumps(payload).encode()
+        return self._bodies[path]
+
+    def tick(self):
+        """Advance the thermostat clock by a minute"""
+        local_time = datetime.datetime.strptime(
+            self.status["localTime"][0][:19], "%Y-%m-%dT%H:%M:%S"
+        ) + datetime.timedelta(minutes=1)
+        self.status["localTime"] = [local_time.strftime("%Y-%m-%dT%H:%M:%S")]
+        self._bodies.pop(PATH_STATUS, None)
+
+    async def _handle_get(self, request):
+        self.requests[("GET", request.path)] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.churn and request.path == PATH_STATUS:
+            self.tick()
+        return web.Response(
+            body=self.body(request.path), content_type="application/json"
+        )
+
+    def lookup(self, path):
+        """Config object at a path below /api/config, or None.  Objects are
+        wrapped in single item lists, which are indexed when the path gives
+        an index and unwrapped otherwise."""
+        node = self.config["data"]
+        for key in path[len(PATH_CONFIG) :].split("/"):
+            if not key:
+                continue
+            if isinstance(node, list):
+                if key.isdigit():
+                    node = node[int(key)] if int(key) < len(node) else None
+                    continue
+                node = node[0] if node else None
+            if not isinstance(node, dict):
+                return None
+            node = node.get(key)
+        if isinstance(node, list) and len(node) == 1:
+            node = node[0]
+        return node if isinstance(node, dict) else None
+
+    async def _handle_get_node(self, request):
+        """Serve a single config object, as Infinitude does below /api/config"""
+        self.requests[("GET", request.path)] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        node = self.lookup(request.path)
+        if node is None:
+            raise web.HTTPNotFound()
+        return web.json_response({"status": True, "data": node, "error": ""})
+
+    async def _handle_post(self, request):
+        self.requests[("POST", request.path)] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        node = self.lookup(request.path)
+        if node is None:
+            raise web.HTTPNotFound()
+        data = dict(await request.post())
+        for key, value in data.items():
+            if key not in self.ignored_keys:
+                # Infinitude returns empty values as empty objects
+                node[key] = [value if value != "" else {}]
+        self._bodies.pop(PATH_CONFIG, None)
+        return web.json_response({"status": True, "data": data, "error": ""})
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get(PATH_STATUS, self._handle_get)
+        app.router.add_get(PATH_CONFIG, self._handle_get)
+        app.router.add_get(PATH_ENERGY, self._handle_get)
+        app.router.add_get(PATH_CONFIG + "/{tail:.+}", self._handle_get_node)
+        app.router.add_post(PATH_CONFIG + "{tail:.*}", self._handle_post)
+        return app
+
+    async def start(self, host="127.0.0.1", port=0):
+        """Start serving, returning the port in use"""
+        self._runner = web.AppRunner(self.app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        return self._runner.addresses[0][1]
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+
+async def serve(args):
+    server = FakeInfinitude(args.zones, args.latency, args.churn, args.ignore_key)
+    port = await server.start(args.host, args.port)
+    print("Fake Infinitude with {} zones on {}:{}".format(args.zones, args.host, port))
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Infinitude server")
+    parser.add_argument("--zones", type=int, default=8, choices=range(1, 9))
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds")
+    parser.add_argument("--churn", action="store_true", help="change every status")
+    parser.add_argument(
+        "--ignore-key",
+        action="append",
+        default=[],
+        help="config key whose POSTed values are not applied, may be repeated",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3000)
+    asyncio.run(serve(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Serve the responses recorded by the capture option of the integration back,
+as any number of virtual Infinitude systems, each on a port of its own.
+
+Each system plays a capture file from the start, looping once it reaches the
+end, at real speed or faster.  A GET is answered with the last response
+recorded for its path by that point of the capture, after the latency it was
+recorded with.  POSTs are answered with the responses recorded for their path
+in turn, without changing what is served.  Systems playing the same file
+start at evenly spread points of it, so that they do not all change at once.
+
+To load test 40 systems from two captures, 20 times faster than recorded:
+
+    python benchmarks/replay_infinitude.py captures/*.jsonl.gz --systems 40 --speed 20
+
+The systems listed in the output can be pasted into the climate platform
+configuration.  Their status interval should be divided by the same speed.
+"""
+import argparse
+import asyncio
+import bisect
+import collections
+import itertools
+import os
+import sys
+import time
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from custom_components.infinitude.capture import read_capture  # noqa: E402
+
+# Response to POSTs to paths that were not written to during the capture
+POST_RESPONSE = '{"status": true, "error": ""}'
+
+
+class Timeline:
+    """Responses recorded for each path, looked up by time in the capture"""
+
+    def __init__(self, records):
+        self.duration = max((record["t"] for record in records), default=0.0)
+        self.gets = collections.defaultdict(lambda: ([], []))
+        self.posts = collections.defaultdict(list)
+        for record in records:
+            if record["method"] == "GET":
+                times, responses = self.gets[record["path"]]
+                times.append(record["t"])
+                responses.append(record)
+            else:
+                self.posts[record["path"]].append(record)
+
+    def get(self, path, t):
+        """Response to a GET at t seconds into the capture, looping over it"""
+        if path not in self.gets:
+            return None
+        if self.duration:
+            t %= self.duration
+        times, responses = self.gets[path]
+        # Before the first request to the path, serve its first response
+        return responses[max(bisect.bisect_right(times, t) - 1, 0)]
+
+
+class ReplaySystem:
+    """One virtual system, playing a timeline from an offset into it"""
+
+    def __init__(self, timeline, offset=0.0, speed=1.0, latency=True):
+        self.timeline = timeline
+        self.offset = offset
+        self.speed = speed
+        self.latency = latency
+        self.started = time.monotonic()
+        self.posts = {
+            path: itertools.cycle(records)
+            for path, records in timeline.posts.items()
+        }
+        self._runner = None
+
+        # Number of requests served, by (method, path)
+        self.requests = collections.Counter()
+
+    def position(self):
+        """Seconds into the capture the system has reached"""
+        return self.offset + (time.monotonic() - self.started) * self.speed
+
+    async def _respond(self, record):
+        if self.latency and record["elapsed"]:
+            await asyncio.sleep(record["elapsed"] / self.speed)
+        return web.Response(
+            status=record["status"],
+            text=record["body"],
+            content_type="application/json",
+        )
+
+    async def _handle_get(self, request):
+        self.requests[("GET", request.path)] += 1
+        record = self.timeline.get(request.path, self.position())
+        if record is None:
+            raise web.HTTPNotFound()
+        return await self._respond(record)
+
+    async def _handle_post(self, request):
+        self.requests[("POST", request.path)] += 1
+        responses = self.posts.get(request.path)
+        if responses is None:
+            return web.Response(text=POST_RESPONSE, content_type="application/json")
+        return await self._respond(next(responses))
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", self._handle_get)
+        app.router.add_post("/{tail:.*}", self._handle_post)
+        return app
+
+    async def start(self, host="127.0.0.1", port=0):
+        """Start serving, returning the port in use"""
+        self._runner = web.AppRunner(self.app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.started = time.monotonic()
+        return self._runner.addresses[0][1]
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+
+def create_systems(timelines, count, speed=1.0, latency=True):
+    """count systems, sharing the timelines in turn, each timeline played
+    from evenly spread offsets"""
+    systems = []
+    for index in range(count):
+        timeline = timelines[index % len(timelines)]
+        # Systems sharing a timeline, and the position of this one among them
+        sharing = len(range(index % len(timelines), count, len(timelines)))
+        offset = timeline.duration * (index // len(timelines)) / sharing
+        systems.append(ReplaySystem(timeline, offset, speed, latency))
+    return systems
+
+
+async def serve(args):
+    timelines = [Timeline(read_capture(filename)) for filename in args.captures]
+    systems = create_systems(timelines, args.systems, args.speed, not args.no_latency)
+    try:
+        ports = [
+            await system.start(args.host, args.port + index if args.port else 0)
+            for index, system in enumerate(systems)
+        ]
+        print(
+            "Replaying {} captures as {} systems at {}x speed".format(
+                len(timelines), len(systems), args.speed
+            )
+        )
+        print("systems:")
+        for index, port in enumerate(ports):
+            print("  - host: {}".format(args.host))
+            print("    port: {}".format(port))
+            print("    name: Replay {}".format(index + 1))
+        await asyncio.Event().wait()
+    finally:
+        for system in systems:
+            if system._runner is not None:
+                await system.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay Infinitude captures")
+    parser.add_argument("captures", nargs="+", help="files written by capture")
+    parser.add_argument("--systems", type=int, default=1, help="virtual systems")
+    parser.add_argument("--speed", type=float, default=1.0, help="playback rate")
+    parser.add_argument(
+        "--no-latency", action="store_true", help="answer without recorded latency"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument(
+        "--port", type=int, default=3000, help="port of the first system, 0 for any"
+    )
+    asyncio.run(serve(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
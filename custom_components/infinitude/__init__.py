@@ -1,3 +1,10 @@
 """Custom component for controlling Carrier Infinity Touch thermostats through an Infinitude proxy server"""
+from .const import DOMAIN
+
 VERSION = "0.7.1"
 
+
+async def async_setup(hass, config):
+    """Keep the configuration, to load the sensor platform of each system"""
+    hass.data.setdefault(DOMAIN, {})["config"] = config
+    return True
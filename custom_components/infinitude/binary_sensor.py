@@ -0,0 +1,86 @@
+"""
+Binary sensors for the zones of an Infinitude system, set up by the climate platform
+"""
+from homeassistant.components.binary_sensor import (
+    BinarySensorDeviceClass,
+    BinarySensorEntity,
+)
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .const import DOMAIN
+
+# Occupancy values reported by zones with a sensor
+OCCUPIED = ("occupied", "motion")
+
+
+async def async_setup_platform(hass, config, async_add_entities, discovery_info=None):
+    """Set up the binary sensors of the system discovered by the climate platform"""
+    if discovery_info is None:
+        return
+    coordinator = hass.data[DOMAIN]["coordinators"][discovery_info["system_id"]]
+    async_add_entities(
+        [
+            InfinitudeOccupancySensor(
+                coordinator, zone_id, discovery_info["zones"][zone_id]
+            )
+            for zone_id in discovery_info["occupancy"]
+        ]
+    )
+
+
+class InfinitudeOccupancySensor(CoordinatorEntity, BinarySensorEntity):
+    _attr_device_class = BinarySensorDeviceClass.OCCUPANCY
+
+    def __init__(self, coordinator, zone_id, zone_name):
+        super().__init__(coordinator)
+        self.zone_id = zone_id
+        self._attr_name = "{} occupancy".format(zone_name)
+        self._attr_unique_id = "{}_zone_{}_occupancy".format(
+            coordinator.system_id, zone_id
+        )
+        self._written = None
+
+    async def async_added_to_hass(self):
+        """Populate with the value the coordinator may have fetched already"""
+        await super().async_added_to_hass()
+        self._attr_is_on = self._is_occupied()
+        self._written = self._written_values()
+
+    def _written_values(self):
+        return (
+            self._attr_is_on,
+            self.coordinator.last_update_success,
+            self.coordinator.stale_since,
+        )
+
+    @property
+    def extra_state_attributes(self):
+        """Set while the values shown were not confirmed by Infinitude"""
+        if self.coordinator.stale_since is None:
+            return None
+        return {"stale_since": self.coordinator.stale_since}
+
+    @property
+    def available(self):
+        """Unavailable until the first full refresh"""
+        return super().available and self.coordinator.data is not None
+
+    def _is_occupied(self):
+        if self.coordinator.data is None:
+            return None
+        occupancy = self.coordinator.data.zones[self.zone_id].occupancy
+        if occupancy is None:
+            return None
+        return occupancy in OCCUPIED
+
+    @callback
+    def _handle_coordinator_update(self):
+        """Only write the state when the occupancy, availability or staleness
+        changed"""
+        self._attr_is_on = self._is_occupied()
+        written = self._written_values()
+        if written == self._written:
+            return
+        self._written = written
+        self.async_write_ha_state()
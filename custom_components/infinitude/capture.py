@@ -0,0 +1,77 @@
+"""
+Recording of the requests made to Infinitude, to be served back by
+benchmarks/replay_infinitude.py
+"""
+import asyncio
+import gzip
+import json
+import threading
+import time
+
+# Records buffered in memory before being appended to the file
+FLUSH_RECORDS = 50
+
+
+class RequestCapture:
+    """Append every request and its response to a gzipped JSON lines file.
+
+    Each line holds the seconds since the capture started, the method, path
+    and form data of the request, and the status, body and latency of the
+    response.  Records are appended in batches from an executor, each batch as
+    a gzip member of its own, so the file stays readable if Home Assistant
+    stops without closing it.
+    """
+
+    def __init__(self, filename, flush_records=FLUSH_RECORDS):
+        self.filename = filename
+        self.flush_records = flush_records
+        self.started = time.monotonic()
+        self._records = []
+        self._writes = set()
+        self._lock = threading.Lock()
+
+    def record(self, method, path, data, status, body, elapsed):
+        self._records.append(
+            json.dumps(
+                {
+                    "t": round(time.monotonic() - self.started, 3),
+                    "method": method,
+                    "path": path,
+                    "data": data,
+                    "status": status,
+                    "elapsed": round(elapsed, 4),
+                    "body": body.decode("utf-8", "replace"),
+                },
+                separators=(",", ":"),
+            )
+        )
+        if len(self._records) >= self.flush_records:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered records without blocking the event loop"""
+        if not self._records:
+            return
+        lines, self._records = self._records, []
+        write = asyncio.get_running_loop().run_in_executor(None, self._write, lines)
+        self._writes.add(write)
+        write.add_done_callback(self._writes.discard)
+
+    async def async_close(self):
+        """Write the remaining records, and wait until all are on disk"""
+        self.flush()
+        if self._writes:
+            await asyncio.gather(*self._writes)
+
+    def _write(self, lines):
+        with self._lock, gzip.open(self.filename, "at", encoding="utf-8") as capture:
+            capture.write("\n".join(lines) + "\n")
+
+
+def read_capture(filename):
+    """Records of a capture file, in the order the requests were made"""
+    with gzip.open(filename, "rt", encoding="utf-8") as capture:
+        records = [json.loads(line) for line in capture if line.strip()]
+    # Batches may have been written out of order
+    records.sort(key=lambda record: record["t"])
+    return records
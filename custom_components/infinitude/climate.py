@@ -26,20 +26,55 @@ from homeassistant.components.climate.const import (
 )
 from homeassistant.const import (
     CONF_HOST,
+    CONF_NAME,
     CONF_PORT,
+    CONF_TIMEOUT,
     ATTR_TEMPERATURE,
     TEMP_FAHRENHEIT,
     TEMP_CELSIUS,
     ATTR_ENTITY_ID,
+    EVENT_HOMEASSISTANT_STOP,
 )
+from homeassistant.exceptions import PlatformNotReady
+from homeassistant.core import callback
+from homeassistant.helpers.aiohttp_client import async_create_clientsession
+from homeassistant.helpers.discovery import async_load_platform
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.util import dt as dt_util
 import voluptuous as vol
 import homeassistant.helpers.config_validation as cv
-from urllib import request, parse
-from urllib.error import URLError
+import aiohttp
+import asyncio
 import json
-import datetime
-import re
 import logging
+import os
+
+from .capture import RequestCapture
+from .const import DOMAIN
+from .coordinator import (
+    CONFIG_INTERVAL,
+    ENERGY_INTERVAL,
+    MAX_INTERVAL,
+    MIN_INTERVAL,
+    SCAN_INTERVAL,
+    WRITE_CONFIRMED,
+    WRITE_PENDING,
+    WRITE_UNCONFIRMED,
+    InfinitudeDataUpdateCoordinator,
+)
+from .infinitude import (
+    DEFAULT_TIMEOUT,
+    MAX_CONCURRENT_REQUESTS,
+    Infinitude,
+    InfinitudeUnavailable,
+    WriteQueue,
+    PATH_CONFIG,
+    PATH_ENERGY,
+)
+from .profiler import CycleProfiler
+from .push import async_register_push
+from .schedule import DAYS, program_changes
+from .telemetry import DEFAULT_CAPACITY, SystemTelemetry
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -88,41 +123,186 @@ PRESET_MODES = [
     PRESET_MANUAL_PERM,
 ]
 
-PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend(
+# Refresh intervals of each Infinitude endpoint
+CONF_STATUS_INTERVAL = "status_interval"
+CONF_CONFIG_INTERVAL = "config_interval"
+CONF_ENERGY_INTERVAL = "energy_interval"
+
+# Bounds of the status interval as it adapts to the activity of the system
+CONF_MIN_INTERVAL = "min_interval"
+CONF_MAX_INTERVAL = "max_interval"
+
+# Receive updates pushed by Infinitude or a relay instead of polling
+CONF_PUSH = "push"
+
+# Several Infinitude systems set up by one platform entry
+CONF_SYSTEMS = "systems"
+CONF_ZONE_NAMES = "zone_names"
+
+# Samples of recent readings kept per zone and resolution, 0 to keep none
+CONF_TELEMETRY_SAMPLES = "telemetry_samples"
+
+# File in the config directory recording every request made to Infinitude
+CONF_CAPTURE = "capture"
+
+# Fields of the export_telemetry and profile services
+ATTR_WINDOW = "window"
+ATTR_FILENAME = "filename"
+ATTR_CYCLES = "cycles"
+ATTR_TIMEOUT = "timeout"
+
+# Fields of each period given to the set_schedule service
+ATTR_PROGRAM = "program"
+ATTR_TIME = "time"
+ATTR_ACTIVITY = "activity"
+ATTR_ENABLED = "enabled"
+
+# Periods start on a quarter hour
+PERIOD_TIME = vol.Match(r"^([01]\d|2[0-3]):(00|15|30|45)$")
+
+PERIOD_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_TIME): PERIOD_TIME,
+        vol.Required(ATTR_ACTIVITY): vol.In(
+            [ACTIVITY_HOME, ACTIVITY_AWAY, ACTIVITY_SLEEP, ACTIVITY_WAKE]
+        ),
+        vol.Optional(ATTR_ENABLED, default=True): cv.boolean,
+    }
+)
+
+# Infinity values of the system mode and zone fan speed
+HVAC_MODE_MAP = {
+    "off": HVAC_MODE_OFF,
+    "heat": HVAC_MODE_HEAT,
+    "cool": HVAC_MODE_COOL,
+    "auto": HVAC_MODE_HEAT_COOL,
+    "fanonly": HVAC_MODE_FAN_ONLY,
+}
+FAN_MODE_MAP = {
+    "off": FAN_AUTO,
+    "high": FAN_HIGH,
+    "med": FAN_MEDIUM,
+    "low": FAN_LOW,
+}
+
+# Presets that switch to (or follow) a scheduled activity
+ACTIVITY_PRESETS = {
+    ACTIVITY_HOME: PRESET_HOME,
+    ACTIVITY_AWAY: PRESET_AWAY,
+    ACTIVITY_SLEEP: PRESET_SLEEP,
+    ACTIVITY_WAKE: PRESET_WAKE,
+}
+
+DEFAULT_PORT = 3000
+
+# Options of each system, given either at the top level or for each entry of
+# the systems list.  Defaults are applied once both are merged.
+SYSTEM_OPTIONS = {
+    vol.Optional(CONF_PORT): cv.port,
+    vol.Optional(CONF_TIMEOUT): cv.positive_int,
+    vol.Optional(CONF_ZONE_NAMES): list,
+    vol.Optional(CONF_STATUS_INTERVAL): cv.time_period,
+    vol.Optional(CONF_CONFIG_INTERVAL): cv.time_period,
+    vol.Optional(CONF_ENERGY_INTERVAL): cv.time_period,
+    vol.Optional(CONF_MIN_INTERVAL): cv.time_period,
+    vol.Optional(CONF_MAX_INTERVAL): cv.time_period,
+    vol.Optional(CONF_PUSH): cv.boolean,
+    vol.Optional(CONF_TELEMETRY_SAMPLES): cv.positive_int,
+    vol.Optional(CONF_CAPTURE): cv.string,
+}
+SYSTEM_DEFAULTS = {
+    CONF_PORT: DEFAULT_PORT,
+    CONF_TIMEOUT: DEFAULT_TIMEOUT,
+    CONF_ZONE_NAMES: [],
+    CONF_STATUS_INTERVAL: SCAN_INTERVAL,
+    CONF_CONFIG_INTERVAL: CONFIG_INTERVAL,
+    CONF_ENERGY_INTERVAL: ENERGY_INTERVAL,
+    CONF_MIN_INTERVAL: MIN_INTERVAL,
+    CONF_MAX_INTERVAL: MAX_INTERVAL,
+    CONF_PUSH: False,
+    CONF_TELEMETRY_SAMPLES: DEFAULT_CAPACITY,
+}
+
+SYSTEM_SCHEMA = vol.Schema(
     {
         vol.Required(CONF_HOST): cv.string,
-        vol.Optional(CONF_PORT, default=3000): cv.port,
-        vol.Optional("zone_names", default=[]): list,
+        vol.Optional(CONF_NAME): cv.string,
+        **SYSTEM_OPTIONS,
     }
 )
 
 
-def setup_platform(hass, config, add_devices, discovery_info=None):
-    """Set up the connection"""
-    host = config.get(CONF_HOST)
-    port = config.get(CONF_PORT)
+def _merge_system_options(config):
+    """Complete each system with the options given at the top level, then
+    with the defaults"""
+    shared = {
+        **SYSTEM_DEFAULTS,
+        **{
+            option.schema: config[option.schema]
+            for option in SYSTEM_OPTIONS
+            if option.schema in config
+        },
+    }
+    if CONF_SYSTEMS not in config:
+        return {**shared, **config}
+    # Systems writing to the same capture file could not be told apart
+    if CONF_CAPTURE in config:
+        raise vol.Invalid(
+            "{} must be given for each system".format(CONF_CAPTURE), [CONF_CAPTURE]
+        )
+    return {
+        **config,
+        CONF_SYSTEMS: [{**shared, **system} for system in config[CONF_SYSTEMS]],
+    }
+
 
-    infinitude = Infinitude(host, port)
-    status = infinitude.status()
+PLATFORM_SCHEMA = vol.All(
+    PLATFORM_SCHEMA.extend(
+        {
+            vol.Exclusive(CONF_HOST, CONF_SYSTEMS): cv.string,
+            vol.Exclusive(CONF_SYSTEMS, CONF_SYSTEMS): vol.All(
+                cv.ensure_list, [SYSTEM_SCHEMA]
+            ),
+            **SYSTEM_OPTIONS,
+        }
+    ),
+    cv.has_at_least_one_key(CONF_HOST, CONF_SYSTEMS),
+    _merge_system_options,
+)
 
-    devices = []
 
-    # Create devices
-    zones = status["zones"][0]["zone"]
-    for i in range(len(zones)):
-        zone_name = None
-        # Manually set zone names if defined in the platform configuration
-        # Keep the system-defined zone name if a manual name is empty/None
-        if "zone_names" in config and len(config["zone_names"]) >= i + 1:
-            name_override = config["zone_names"][i]
-            if name_override is not None:
-                zone_name = name_override
-        # Only create if the zone is enabled
-        if zones[i]["enabled"][0] == "on":
-            devices.append(InfinitudeZone(infinitude, zones[i]["id"], zone_name))
-    add_devices(devices)
+async def async_setup_platform(hass, config, async_add_devices, discovery_info=None):
+    """Set up the connection to each system"""
+    systems = config.get(CONF_SYSTEMS) or [config]
+
+    # Requests in flight are capped across all systems
+    semaphore = hass.data.setdefault(DOMAIN, {}).setdefault(
+        "semaphore", asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    )
+
+    # Zones are discovered from the data stored before the last restart, or
+    # else from a single status request per system.  Their entities are
+    # registered straight away, showing the stored data as stale or staying
+    # unavailable until the first full refresh completes in the background.
+    coordinators = [_create_coordinator(hass, system, semaphore) for system in systems]
+    await asyncio.gather(*(coordinator.async_restore() for coordinator in coordinators))
+    try:
+        statuses = await asyncio.gather(
+            *(_async_discover(coordinator) for coordinator in coordinators)
+        )
+    except (aiohttp.ClientError, asyncio.TimeoutError, InfinitudeUnavailable) as e:
+        raise PlatformNotReady(
+            "Unable to retrieve status from Infinitude: {}".format(e)
+        ) from e
 
-    def service_set_hold_mode(service):
+    devices = []
+    for system, coordinator, status in zip(systems, coordinators, statuses):
+        devices.extend(_setup_system(hass, system, coordinator, status))
+    async_add_devices(devices)
+    for coordinator in coordinators:
+        hass.async_create_task(coordinator.async_refresh())
+
+    async def async_service_set_hold_mode(service):
         """Set the Hold Mode on the target thermostats."""
         # TODO: Add constants and a service schema?
         entity_id = service.data.get(ATTR_ENTITY_ID)
@@ -137,288 +317,399 @@ def setup_platform(hass, config, add_devices, discovery_info=None):
         else:
             target_zones = devices
 
-        for zone in target_zones:
-            zone.set_hold_mode(mode=mode, until=until, activity=activity)
+        # Zones are written concurrently, each with a single POST
+        results = await asyncio.gather(
+            *(
+                zone.async_set_hold_mode(mode=mode, until=until, activity=activity)
+                for zone in target_zones
+            ),
+            return_exceptions=True,
+        )
+        for zone, result in zip(target_zones, results):
+            if isinstance(result, Exception):
+                _LOGGER.error("Unable to set hold mode of %s: %s", zone.name, result)
 
-    hass.services.register("infinitude", "set_hold_mode", service_set_hold_mode)
-    return True
+    hass.services.async_register(
+        DOMAIN, "set_hold_mode", async_service_set_hold_mode
+    )
 
+    async def async_service_export_telemetry(service):
+        """Write the recent readings of the target zones to a JSON file in the
+        config directory, as one list per reading"""
+        entity_id = service.data.get(ATTR_ENTITY_ID)
+        if entity_id:
+            target_zones = [
+                device for device in devices if device.entity_id in entity_id
+            ]
+        else:
+            target_zones = devices
 
-class Infinitude:
-    def __init__(self, host, port):
-        self.host = host
-        self.port = port
+        end = dt_util.utcnow()
+        start = end - service.data[ATTR_WINDOW]
+        export = {
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "zones": {
+                zone.entity_id: zone.coordinator.telemetry.export(
+                    zone.zone_id, start.timestamp(), end.timestamp()
+                )
+                for zone in target_zones
+                if zone.coordinator.telemetry is not None
+            },
+        }
+        filename = service.data.get(ATTR_FILENAME)
+        if not filename:
+            filename = "infinitude_telemetry_{}.json".format(
+                dt_util.now().strftime("%Y%m%d_%H%M%S")
+            )
+        # Only files directly in the config directory can be written
+        path = hass.config.path(os.path.basename(filename))
+        await hass.async_add_executor_job(_write_json, path, export)
+        _LOGGER.info("Exported telemetry of %s zones to %s", len(export["zones"]), path)
+
+    hass.services.async_register(
+        DOMAIN,
+        "export_telemetry",
+        async_service_export_telemetry,
+        schema=vol.Schema(
+            {
+                vol.Optional(ATTR_ENTITY_ID): cv.entity_ids,
+                vol.Optional(ATTR_WINDOW, default={"hours": 24}): cv.time_period,
+                vol.Optional(ATTR_FILENAME): cv.string,
+            }
+        ),
+    )
+
+    async def async_service_set_schedule(service):
+        """Change the weekly program of the target zones, writing only the
+        periods that differ from the cached config"""
+        entity_id = service.data.get(ATTR_ENTITY_ID)
+        if entity_id:
+            target_zones = [
+                device for device in devices if device.entity_id in entity_id
+            ]
+        else:
+            target_zones = devices
 
-    def api(self, path, req_data=None):
-        url = "http://{}:{}{}".format(self.host, self.port, path)
+        week = service.data[ATTR_PROGRAM]
+        results = await asyncio.gather(
+            *(zone.async_set_schedule(week) for zone in target_zones),
+            return_exceptions=True,
+        )
+        for zone, result in zip(target_zones, results):
+            if isinstance(result, Exception):
+                _LOGGER.error("Unable to set schedule of %s: %s", zone.name, result)
+
+    hass.services.async_register(
+        DOMAIN,
+        "set_schedule",
+        async_service_set_schedule,
+        schema=vol.Schema(
+            {
+                vol.Optional(ATTR_ENTITY_ID): cv.entity_ids,
+                vol.Required(ATTR_PROGRAM): {
+                    vol.In(DAYS): vol.All(cv.ensure_list, [PERIOD_SCHEMA])
+                },
+            }
+        ),
+    )
+
+    async def async_service_profile(service):
+        """Profile the next poll cycles of every system and the writes made
+        meanwhile, then write the report to the config directory"""
+        coordinators = hass.data[DOMAIN]["coordinators"].values()
+        if any(c.infinitude.profiler is not None for c in coordinators):
+            _LOGGER.warning("Infinitude is already being profiled")
+            return
+        filename = service.data.get(ATTR_FILENAME)
+        if not filename:
+            filename = "infinitude_profile_{}.txt".format(
+                dt_util.now().strftime("%Y%m%d_%H%M%S")
+            )
+        # Only files directly in the config directory can be written
+        path = hass.config.path(os.path.basename(filename))
+
+        @callback
+        def _profiled(profiler):
+            for coordinator in coordinators:
+                coordinator.infinitude.profiler = None
+            hass.async_create_task(_async_write_profile(profiler))
+
+        async def _async_write_profile(profiler):
+            await hass.async_add_executor_job(profiler.write, path)
+            _LOGGER.info(
+                "Wrote the profile of %s polls to %s", profiler.counts["poll"], path
+            )
 
-        # If data is provided, encode for POSTing
-        if req_data is not None:
-            req_data = parse.urlencode(req_data).encode("ascii")
-        _LOGGER.debug(url, req_data)
-        req = request.Request(url, req_data)
-        with request.urlopen(req) as response:
-            resp_data = json.loads(response.read().decode())
-        _LOGGER.debug(resp_data)
-        return resp_data
+        profiler = CycleProfiler(
+            [c.system_id for c in coordinators],
+            service.data[ATTR_CYCLES],
+            _profiled,
+            timeout=service.data[ATTR_TIMEOUT].total_seconds(),
+        )
+        for coordinator in coordinators:
+            coordinator.infinitude.profiler = profiler
+
+    hass.services.async_register(
+        DOMAIN,
+        "profile",
+        async_service_profile,
+        schema=vol.Schema(
+            {
+                vol.Optional(ATTR_CYCLES, default=5): vol.All(
+                    vol.Coerce(int), vol.Range(min=1)
+                ),
+                vol.Optional(ATTR_TIMEOUT, default={"minutes": 10}): cv.time_period,
+                vol.Optional(ATTR_FILENAME): cv.string,
+            }
+        ),
+    )
+    return True
 
-    def status(self):
-        status = self.api("/api/status")
-        return status
 
-    def config(self):
-        config = self.api("/api/config")
-        return config["data"]
+def _write_json(path, data):
+    with open(path, "w") as file:
+        json.dump(data, file, separators=(",", ":"))
+
+
+def _create_coordinator(hass, config, semaphore):
+    session = async_create_clientsession(hass)
+    infinitude = Infinitude(
+        session,
+        config[CONF_HOST],
+        config[CONF_PORT],
+        timeout=config[CONF_TIMEOUT],
+        refresh_intervals={
+            PATH_CONFIG: config[CONF_CONFIG_INTERVAL].total_seconds(),
+            PATH_ENERGY: config[CONF_ENERGY_INTERVAL].total_seconds(),
+        },
+        semaphore=semaphore,
+    )
+    if CONF_CAPTURE in config:
+        # Only files directly in the config directory can be written
+        capture = infinitude.capture = RequestCapture(
+            hass.config.path(os.path.basename(config[CONF_CAPTURE]))
+        )
 
-    def energy(self):
-        energy = self.api("/energy.json")
-        return energy
+        async def _async_close_capture(event):
+            await capture.async_close()
+
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_close_capture)
+    samples = config[CONF_TELEMETRY_SAMPLES]
+    # Sensors of the system are named after it, or else after Infinitude's
+    # host, and port unless it is the default
+    system_name = config.get(CONF_NAME)
+    if system_name is None:
+        system_name = "Infinitude {}".format(config[CONF_HOST])
+        if config[CONF_PORT] != DEFAULT_PORT:
+            system_name = "{}:{}".format(system_name, config[CONF_PORT])
+    return InfinitudeDataUpdateCoordinator(
+        hass,
+        infinitude,
+        update_interval=None if config[CONF_PUSH] else config[CONF_STATUS_INTERVAL],
+        telemetry=SystemTelemetry(samples) if samples else None,
+        min_interval=config[CONF_MIN_INTERVAL],
+        max_interval=config[CONF_MAX_INTERVAL],
+        system_name=system_name,
+    )
+
+
+async def _async_discover(coordinator):
+    """Return the status to create the zones of a system from.  A single
+    request is made, so that setup is retried soon if Infinitude is down."""
+    if coordinator.data is not None:
+        return coordinator.data.status
+    return await coordinator.infinitude.async_status(retry=False)
+
+
+def _setup_system(hass, config, coordinator, status):
+    """Register a system, and return the climate entities of the zones in its
+    status"""
+    hass.data[DOMAIN].setdefault("coordinators", {})[
+        coordinator.system_id
+    ] = coordinator
+    if config[CONF_PUSH]:
+        async_register_push(hass, coordinator)
+    system_name = config.get(CONF_NAME)
 
+    devices = []
 
-class InfinitudeZone(ClimateEntity):
-    def __init__(self, infinitude, zone_id, zone_name_custom=None):
-        self.infinitude = infinitude
+    # Create devices
+    zones = status["zones"][0]["zone"]
+    for i in range(len(zones)):
+        # Only create if the zone is enabled
+        if zones[i]["enabled"][0] != "on":
+            continue
+        zone_name = zones[i]["name"][0]
+        # Manually set zone names if defined in the platform configuration
+        # Keep the system-defined zone name if a manual name is empty/None
+        if len(config[CONF_ZONE_NAMES]) >= i + 1:
+            name_override = config[CONF_ZONE_NAMES][i]
+            if name_override is not None:
+                zone_name = name_override
+        devices.append(
+            InfinitudeZone(coordinator, zones[i]["id"], zone_name, system_name)
+        )
+
+    # Sensors of the system and its zones are platforms of their own
+    for platform in ("sensor", "binary_sensor"):
+        hass.async_create_task(
+            async_load_platform(
+                hass,
+                platform,
+                DOMAIN,
+                {
+                    "system_id": coordinator.system_id,
+                    "zones": {device.zone_id: device.name for device in devices},
+                    # Zones with an occupancy sensor
+                    "occupancy": [
+                        zone["id"]
+                        for zone in zones
+                        if zone["enabled"][0] == "on" and "occupancy" in zone
+                    ],
+                },
+                hass.data[DOMAIN].get("config", {}),
+            )
+        )
+    return devices
+
+
+class InfinitudeZone(CoordinatorEntity, ClimateEntity):
+    def __init__(self, coordinator, zone_id, zone_name, system_name=None):
+        """system_name prefixes the zone name, to tell apart the zones of
+        several systems"""
+        super().__init__(coordinator)
+        self.infinitude = coordinator.infinitude
+        self.writes = WriteQueue(
+            self.infinitude,
+            on_written=coordinator.async_patch_written,
+            on_failed=coordinator.async_patch_failed,
+        )
         self.zone_id = zone_id
-        self.zone_name_custom = zone_name_custom
-
-        self.system_status = {}
-        self.system_config = {}
-        self.zone_status = {}
-        self.zone_config = {}
-
-        self._temperature_unit = None  # F, C
-        self._current_temperature = None
-        self._current_humidity = None
-        self._hvac_mode = None  # auto, heat, cool, off, fanonly
-        self._hvac_action = None  # active_heat, active_cool, idle, more?
-        self._fan_mode = None  # off, high, med, low
-
-        self.zone_name = None
-        self.hold_state = None  # on, off
-        self.hold_activity = None  # home, away, sleep, wake, manual
-        self.hold_until = None  # HH:MM (on the quarter-hour)
+        if system_name is not None:
+            zone_name = "{} {}".format(system_name, zone_name)
+        self._attr_name = zone_name
+        self._attr_unique_id = "{}_zone_{}".format(coordinator.system_id, zone_id)
+
+        # Shared snapshots of the system and of this zone, parsed by the coordinator
+        self.system = None
+        self.zone = None
+
+        # Derived from the snapshots once per update - see _update_from_data
+        # The unit and features are only placeholders until the first refresh
+        self._temperature_unit = TEMP_FAHRENHEIT
+        self._hvac_mode = None
+        self._hvac_action = None
+        self._fan_mode = None
+        self._target_temperature = None
+        self._supported_features = SUPPORT_FAN_MODE | SUPPORT_PRESET_MODE
         self.hold_mode = None  # Computed - not in the API
-        self.setpoint_heat = None
-        self.setpoint_cool = None
-        self.activity_current = None  # Computed - NOT the API status value
-        self.activity_scheduled = None
-        self.activity_scheduled_start = None
-        self.activity_next = None
-        self.activity_next_start = None
-        self.occupancy = None  # occupied, unoccupied, motion
-        self.airflow_cfm = None
-        self.humid = None
-        self.filtrlvl = None
-        self.humlvl = None
-        self.ventlvl = None
-        self.uvlvl = None
-        self.idu_modulation = None
-        self.outdoor_temperature = None
-
-        self.energy = None
-
         self._preset_mode = None
 
         # Needed for API calls that update Zones, which use a zero-based zone index
         # Assuming that Zones are always listed in ascending order of their "ID" attribute
         # See https://github.com/nebulous/infinitude/issues/65#issuecomment-447971081
         self.zone_index = int(self.zone_id) - 1
+        self._written_state = None
 
-        # Populate with initial values
-        self.update()
+    async def async_added_to_hass(self):
+        """Populate with the values the coordinator may have fetched already"""
+        await super().async_added_to_hass()
+        self._update_from_data()
+        self._written_state = self._state_values()
 
     @property
-    def name(self):
-        """Return the name of the climate device."""
-        if self.zone_name_custom is not None:
-            return self.zone_name_custom
-        else:
-            return self.zone_name
+    def available(self):
+        """Unavailable until the first full refresh"""
+        return super().available and self.zone is not None
+
+    @callback
+    def _handle_coordinator_update(self):
+        """Parse the shared system data whenever the coordinator refreshes it.
+        The state is only written when a value shown by the entity changed."""
+        self._update_from_data()
+        state = self._state_values()
+        if state == self._written_state:
+            return
+        self._written_state = state
+        super()._handle_coordinator_update()
+
+    def _state_values(self):
+        zone = self.zone
+        if zone is None:
+            return (self.coordinator.last_update_success,)
+        return (
+            self.coordinator.last_update_success,
+            self.coordinator.stale_since,
+            self.write_state,
+            self._temperature_unit,
+            self._hvac_mode,
+            self._hvac_action,
+            self._fan_mode,
+            self._target_temperature,
+            self._supported_features,
+            self._preset_mode,
+            zone.current_temperature,
+            zone.current_humidity,
+            zone.setpoint_heat,
+            zone.setpoint_cool,
+        )
 
-    @property
-    def should_poll(self):
-        """Return the polling state."""
-        return True
-
-    def update(self):
-        def get_safe(source, key, index=0, empty_dict_as_none=True):
-            """Helper function to safely parse JSON coming from Infinitude,
-            where single values can be returned as lists"""
-            result = None
-            val = source.get(key, None)
-            if val is None:
-                result = None
-            elif index is None:
-                result = val
-            else:
-                result = val[index]
-            if empty_dict_as_none and type(result) is dict and len(result) == 0:
-                result = None
-            return result
-
-        # Retrieve full system status and config
-        try:
-            self.system_status = self.infinitude.status()
-            self.system_config = self.infinitude.config()
-            self.energy_stats = self.infinitude.energy()
-        except URLError as e:
-            _LOGGER.error(
-                "Unable to retrieve data from Infinitude: {}".format(e.reason)
-            )
+    def _update_from_data(self):
+        # Full system status and config, parsed once per cycle for all zones
+        if self.coordinator.data is None:
             return
+        self.system = self.coordinator.data
+        self.zone = zone = self.system.zones[self.zone_id]
 
-        # Parse system data for zone-specific information
-        self.zone_status = next(
-            (
-                z
-                for z in get_safe(self.system_status, "zones")["zone"]
-                if z["id"] == self.zone_id
-            ),
-            None,
-        )
-        self.zone_config = next(
-            (
-                z
-                for z in get_safe(self.system_config, "zones")["zone"]
-                if z["id"] == self.zone_id
-            ),
-            None,
-        )
+        if self.system.temperature_unit == "C":
+            self._temperature_unit = TEMP_CELSIUS
+        else:
+            self._temperature_unit = TEMP_FAHRENHEIT
 
-        # These status values are always reliable
-        self.zone_name = get_safe(self.zone_status, "name")
-        self._temperature_unit = get_safe(self.system_config, "cfgem")
-        self._current_temperature = float(get_safe(self.zone_status, "rt"))
-        self._hvac_action = get_safe(self.zone_status, "zoneconditioning")
-        self._current_humidity = float(get_safe(self.zone_status, "rh"))
-        self._hvac_mode = get_safe(self.system_config, "mode")
-        self.hold_state = get_safe(self.zone_config, "hold")
-        self.hold_activity = get_safe(self.zone_config, "holdActivity")
-        self.hold_until = get_safe(self.zone_config, "otmr")
-        self.humid = get_safe(self.system_status, "humid")
-        self.filtrlvl = get_safe(self.system_status, "filtrlvl")
-        self.humlvl = get_safe(self.system_status, "humlvl")
-        self.ventlvl = get_safe(self.system_status, "ventlvl")
-        self.uvlvl = get_safe(self.system_status, "uvlvl") 
-
-        # Occupancy is not always present
-        self.occupancy = get_safe(self.zone_status, "occupancy")
-        
-        # energy.json is not always filled
-        if len(self.energy_stats) > 0:
-            energy_periods = self.energy_stats["energy"][0]["usage"][0]["period"]
-            energy_periods_dict = {}
-            for period in energy_periods:
-                period_id = period["id"]
-                period.pop("id")
-                period_unpacked = {}
-                for attrib in period:
-                    period_unpacked[attrib] = int(period[attrib][0])
-                energy_periods_dict[period_id] = period_unpacked
-
-            self.energy = energy_periods_dict
-            _LOGGER.debug("%s energy stats present", len(energy_periods))
-        else: 
-            _LOGGER.debug("no energy stats %s", self.energy_stats)
-
-        # Only get CFM if IDU is present
-        idu = get_safe(self.system_status, "idu")
-        self.airflow_cfm = None
-        if idu is not None:
-            self.airflow_cfm = float(get_safe(idu, "cfm"))
-
-        # Only get modulating percentage if IDU type is furnacemodulating
-        idu_modulation = None
-        if idu is not None and get_safe(idu, "type") == "furnacemodulating":
-            idu_opstat = get_safe(idu, "opstat");
-            if idu_opstat.isnumeric():
-                self.idu_modulation = int(idu_opstat)
-            else:
-                self.idu_modulation = 0
+        self._hvac_mode = HVAC_MODE_MAP.get(self.system.hvac_mode, HVAC_MODE_OFF)
 
-        # Safely handle missing outdoor temperature
-        oat = get_safe(self.system_status, "oat")
-        if isinstance(oat, dict):
-            self.outdoor_temperature = None
+        # TODO: Add logic for fan
+        if self._hvac_mode == HVAC_MODE_OFF:
+            self._hvac_action = CURRENT_HVAC_OFF
+        elif zone.conditioning == "idle":
+            self._hvac_action = CURRENT_HVAC_IDLE
+        elif "heat" in zone.conditioning:
+            self._hvac_action = CURRENT_HVAC_HEAT
+        elif "cool" in zone.conditioning:
+            self._hvac_action = CURRENT_HVAC_COOL
         else:
-            self.outdoor_temperature = oat
-
-        # These status values may be outdated if a pending
-        # manual override was submitted via the API - see below
-        self.setpoint_heat = float(get_safe(self.zone_status, "htsp"))
-        self.setpoint_cool = float(get_safe(self.zone_status, "clsp"))
-        self._fan_mode = get_safe(self.zone_status, "fan")
-        self.activity_current = get_safe(self.zone_status, "currentActivity")
-
-        # Status for setpoints and fan mode will only reflect API changes after an update/refresh cycle.
-        # But we want the frontend to immediately reflect the new value, which is also stored
-        # in the zone config.
-        #
-        # To get the true values, need to know what the current activity is.
-        # If hold_activity=manual in the zone config, we know the current activity is manual,
-        # even if the thermostat status does not yet reflect the change submitted via the API.
-        # We can override with the correct values from the zone config.
-        if get_safe(self.zone_config, "holdActivity") == "manual":
-            activity_manual = next(
-                (
-                    a
-                    for a in get_safe(self.zone_config, "activities")["activity"]
-                    if a["id"] == "manual"
-                ),
-                None,
-            )
-            if activity_manual is not None:
-                self.activity_current = "manual"
-                self.setpoint_heat = float(get_safe(activity_manual, "htsp"))
-                self.setpoint_cool = float(get_safe(activity_manual, "clsp"))
-                self._fan_mode = get_safe(activity_manual, "fan")
-
-        # Iterate through the system config to calculate the current and next schedule details
-        # Looks for the next 'enabled' period in the zone program
-        self.activity_scheduled = None
-        self.activity_scheduled_start = None
-        self.activity_next = None
-        self.activity_next_start = None
-
-        # Current timestamp can include a TZ offset in some systems.  It should be stripped off
-        # since the timestamp is already in the local time.
-        local_time = get_safe(self.system_status, "localTime")
-        matches = re.match(
-            r"^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})([+-]\d{2}:\d{2})?$", local_time
-        )
-        local_time = matches.group(1)
-        dt = datetime.datetime.strptime(local_time, "%Y-%m-%dT%H:%M:%S")
-
-        while self.activity_next is None:
-            day_name = dt.strftime("%A")
-            program = next(
-                (
-                    day
-                    for day in get_safe(self.zone_config, "program")["day"]
-                    if day["id"] == day_name
-                )
+            self._hvac_action = CURRENT_HVAC_IDLE
+
+        # Infinity's internal value of 'off' displays as 'auto' on the thermostat
+        self._fan_mode = FAN_MODE_MAP.get(zone.fan_mode)
+
+        # Infinity 'auto' mode maps to HVAC_MODE_HEAT_COOL.
+        # If enabled, set target temperature based on the current HVAC_action
+        baseline_features = SUPPORT_FAN_MODE | SUPPORT_PRESET_MODE
+        if self._hvac_mode == HVAC_MODE_HEAT_COOL:
+            if self._hvac_action == CURRENT_HVAC_HEAT:
+                self._target_temperature = zone.setpoint_heat
+            elif self._hvac_action == CURRENT_HVAC_COOL:
+                self._target_temperature = zone.setpoint_cool
+            else:
+                self._target_temperature = zone.current_temperature
+            self._supported_features = (
+                baseline_features | SUPPORT_TARGET_TEMPERATURE_RANGE
             )
-            for period in program["period"]:
-                if get_safe(period, "enabled") == "off":
-                    continue
-                period_hh, period_mm = get_safe(period, "time").split(":")
-                period_datetime = datetime.datetime(
-                    dt.year, dt.month, dt.day, int(period_hh), int(period_mm)
-                )
-                if period_datetime < dt:
-                    self.activity_scheduled = get_safe(period, "activity")
-                    self.activity_scheduled_start = period_datetime
-                if period_datetime >= dt:
-                    self.activity_next = get_safe(period, "activity")
-                    self.activity_next_start = period_datetime
-                    break
-            dt = datetime.datetime(
-                year=dt.year, month=dt.month, day=dt.day
-            ) + datetime.timedelta(days=1)
+        elif self._hvac_mode == HVAC_MODE_HEAT:
+            self._target_temperature = zone.setpoint_heat
+            self._supported_features = baseline_features | SUPPORT_TARGET_TEMPERATURE
+        elif self._hvac_mode == HVAC_MODE_COOL:
+            self._target_temperature = zone.setpoint_cool
+            self._supported_features = baseline_features | SUPPORT_TARGET_TEMPERATURE
+        else:
+            self._target_temperature = zone.current_temperature
+            self._supported_features = baseline_features
 
         # Compute a custom 'hold_mode' based on the combination of hold values
-        if self.hold_state == HOLD_ON:
-            if self.hold_until is None:
+        if zone.hold_state == HOLD_ON:
+            if zone.hold_until is None:
                 self.hold_mode = HOLD_MODE_INDEFINITE
             else:
                 self.hold_mode = HOLD_MODE_UNTIL
@@ -428,30 +719,16 @@ class InfinitudeZone(ClimateEntity):
         # Update the preset mode based on current state
         # If hold is off, preset is the currently scheduled activity
         if self.hold_mode == HOLD_MODE_OFF:
-            if self.activity_scheduled == ACTIVITY_HOME:
-                self._preset_mode = PRESET_HOME
-            elif self.activity_scheduled == ACTIVITY_AWAY:
-                self._preset_mode = PRESET_AWAY
-            elif self.activity_scheduled == ACTIVITY_SLEEP:
-                self._preset_mode = PRESET_SLEEP
-            elif self.activity_scheduled == ACTIVITY_WAKE:
-                self._preset_mode = PRESET_WAKE
-            else:
-                self._preset_mode = PRESET_SCHEDULE
+            self._preset_mode = ACTIVITY_PRESETS.get(
+                zone.activity_scheduled, PRESET_SCHEDULE
+            )
         elif self.hold_mode == HOLD_MODE_UNTIL:
             # A temporary hold on the 'manual' activity is an 'override'
-            if self.hold_activity == ACTIVITY_MANUAL:
+            if zone.hold_activity == ACTIVITY_MANUAL:
                 self._preset_mode = PRESET_MANUAL_TEMP
             # A temporary hold is on a non-'manual' activity is that activity
-            else:
-                if self.hold_activity == ACTIVITY_HOME:
-                    self._preset_mode = PRESET_HOME
-                elif self.hold_activity == ACTIVITY_AWAY:
-                    self._preset_mode = PRESET_AWAY
-                elif self.hold_activity == ACTIVITY_SLEEP:
-                    self._preset_mode = PRESET_SLEEP
-                elif self.hold_activity == ACTIVITY_WAKE:
-                    self._preset_mode = PRESET_WAKE
+            elif zone.hold_activity in ACTIVITY_PRESETS:
+                self._preset_mode = ACTIVITY_PRESETS[zone.hold_activity]
         # An indefinite hold on any activity is a 'hold'
         else:
             self._preset_mode = PRESET_MANUAL_PERM
@@ -466,46 +743,39 @@ class InfinitudeZone(ClimateEntity):
         return super().precision
 
     @property
-    def state_attributes(self):
-        """Return the optional state attributes."""
-        default_attributes = super().state_attributes
-        custom_attributes = {
-            "current_activity": self.activity_current,
-            "scheduled_activity": self.activity_scheduled,
-            "scheduled_activity_start": self.activity_scheduled_start,
-            "next_activity": self.activity_next,
-            "next_activity_start": self.activity_next_start,
-            "hold_state": self.hold_state,
-            "hold_activity": self.hold_activity,
-            "hold_until": self.hold_until,
-            "outdoor_temperature": self.outdoor_temperature,
-            "humid": self.humid,
-            "filtrlvl": self.filtrlvl,
-            "humlvl": self.humlvl,
-            "ventlvl": self.ventlvl,
-            "uvlvl": self.uvlvl,
-            "idu_modulation": self.idu_modulation,
-            "airflow_cfm": self.airflow_cfm,
-            "occupancy": self.occupancy,
-            "energy": self.energy,
+    def extra_state_attributes(self):
+        """Return the optional state attributes.
+        Telemetry, schedule and hold details have sensors of their own."""
+        # Set while Infinitude is unreachable and the last values are shown
+        return {
+            "stale_since": self.coordinator.stale_since,
+            "write_state": self.write_state,
+        }
+
+    @property
+    def write_state(self):
+        """Whether Infinitude holds the last changes made to this zone or
+        to the whole system, None until one is made"""
+        prefix = "/api/config/zones/zone/{}/".format(self.zone_index)
+        states = {
+            state
+            for path, state in self.coordinator.write_states.items()
+            if path == PATH_CONFIG or path.startswith(prefix)
         }
-        attributes = {}
-        attributes.update(default_attributes)
-        attributes.update(custom_attributes)
-        return attributes
+        for state in (WRITE_PENDING, WRITE_UNCONFIRMED, WRITE_CONFIRMED):
+            if state in states:
+                return state
+        return None
 
     @property
     def temperature_unit(self):
         """Return the unit of measurement."""
-        if self._temperature_unit == "C":
-            return TEMP_CELSIUS
-        else:
-            return TEMP_FAHRENHEIT
+        return self._temperature_unit
 
     @property
     def current_humidity(self):
         """Return the current humidity."""
-        return self._current_humidity
+        return self.zone.current_humidity
 
     @property
     def target_humidity(self):
@@ -517,18 +787,7 @@ class InfinitudeZone(ClimateEntity):
         """Return hvac operation ie. heat, cool mode.
         Need to be one of HVAC_MODE_*.
         """
-        if self._hvac_mode == "heat":
-            return HVAC_MODE_HEAT
-        elif self._hvac_mode == "cool":
-            return HVAC_MODE_COOL
-        elif self._hvac_mode == "auto":
-            return HVAC_MODE_HEAT_COOL
-        elif self._hvac_mode == "fanonly":
-            return HVAC_MODE_FAN_ONLY
-        elif self._hvac_mode == "off":
-            return HVAC_MODE_OFF
-        else:
-            return HVAC_MODE_OFF
+        return self._hvac_mode
 
     @property
     def hvac_modes(self):
@@ -548,55 +807,27 @@ class InfinitudeZone(ClimateEntity):
         """Return the current running hvac operation if supported.
         Need to be one of CURRENT_HVAC_*.
         """
-        # TODO: Add logic for fan
-        if self.hvac_mode == HVAC_MODE_OFF:
-            return CURRENT_HVAC_OFF
-        elif self._hvac_action == "idle":
-            return CURRENT_HVAC_IDLE
-        elif "heat" in self._hvac_action:
-            return CURRENT_HVAC_HEAT
-        elif "cool" in self._hvac_action:
-            return CURRENT_HVAC_COOL
-        else:
-            return CURRENT_HVAC_IDLE
+        return self._hvac_action
 
     @property
     def current_temperature(self):
         """Return the current temperature."""
-        return self._current_temperature
+        return self.zone.current_temperature
 
     @property
     def target_temperature(self):
         """Return the temperature we try to reach."""
-
-        # Infinity 'auto' mode maps to HVAC_MODE_HEAT_COOL.
-        # If enabled, set target temperature based on the current HVAC_action
-        if self.hvac_mode == HVAC_MODE_HEAT_COOL:
-            if self.hvac_action == CURRENT_HVAC_HEAT:
-                return self.setpoint_heat
-            elif self.hvac_action == CURRENT_HVAC_COOL:
-                return self.setpoint_cool
-            else:
-                return self.current_temperature
-
-        elif self.hvac_mode == HVAC_MODE_HEAT:
-            return self.setpoint_heat
-
-        elif self.hvac_mode == HVAC_MODE_COOL:
-            return self.setpoint_cool
-
-        else:
-            return self.current_temperature
+        return self._target_temperature
 
     @property
     def target_temperature_high(self):
         """Return the highbound target temperature we try to reach."""
-        return self.setpoint_cool
+        return self.zone.setpoint_cool
 
     @property
     def target_temperature_low(self):
         """Return the lowbound target temperature we try to reach."""
-        return self.setpoint_heat
+        return self.zone.setpoint_heat
 
     @property
     def preset_mode(self):
@@ -625,14 +856,7 @@ class InfinitudeZone(ClimateEntity):
         Requires SUPPORT_FAN_MODE.
         Infinity's internal value of 'off' displays as 'auto' on the thermostat
         """
-        if self._fan_mode == "off":
-            return FAN_AUTO
-        elif self._fan_mode == "high":
-            return FAN_HIGH
-        elif self._fan_mode == "med":
-            return FAN_MEDIUM
-        elif self._fan_mode == "low":
-            return FAN_LOW
+        return self._fan_mode
 
     @property
     def fan_modes(self):
@@ -655,40 +879,37 @@ class InfinitudeZone(ClimateEntity):
         """
         raise NotImplementedError
 
-    def set_temperature(self, **kwargs):
+    async def async_set_temperature(self, **kwargs):
         """Set new target temperature."""
         data = {}
         if ATTR_TEMPERATURE in kwargs:
             if self.hvac_mode == HVAC_MODE_HEAT:
-                self.setpoint_heat = kwargs["temperature"]
                 data["htsp"] = kwargs["temperature"]
             elif self.hvac_mode == HVAC_MODE_COOL:
-                self.setpoint_cool = kwargs["temperature"]
                 data["clsp"] = kwargs["temperature"]
 
         if ATTR_TARGET_TEMP_HIGH in kwargs:
-            self.setpoint_cool = kwargs[ATTR_TARGET_TEMP_HIGH]
             data["clsp"] = kwargs[ATTR_TARGET_TEMP_HIGH]
 
         if ATTR_TARGET_TEMP_LOW in kwargs:
-            self.setpoint_heat = kwargs[ATTR_TARGET_TEMP_LOW]
             data["htsp"] = kwargs[ATTR_TARGET_TEMP_LOW]
 
         # Update the 'manual' activity with the updated temperatures
         # Enable hold until the next schedule change
-        self.infinitude.api(
+        # Both are written together once the temperature stops changing
+        self._queue_write(
             "/api/config/zones/zone/{}/activities/activity/{}/".format(
                 self.zone_index, ACTIVITY_MANUAL_INDEX
             ),
             data,
         )
-        self.set_hold_mode(activity=ACTIVITY_MANUAL)
+        await self.async_set_hold_mode(activity=ACTIVITY_MANUAL)
 
     def set_humidity(self, humidity):
         """Set new target humidity."""
         raise NotImplementedError
 
-    def set_fan_mode(self, fan_mode):
+    async def async_set_fan_mode(self, fan_mode):
         """Set new target fan mode.
         When set to 'auto', map to Infinity's internal value of 'off'
         """
@@ -697,15 +918,19 @@ class InfinitudeZone(ClimateEntity):
 
         # Update the 'manual' activity with the selected fan mode, preserving the current setbacks
         # Enable hold until the next schedule change
-        self.infinitude.api(
+        self._queue_write(
             "/api/config/zones/zone/{}/activities/activity/{}/".format(
                 self.zone_index, ACTIVITY_MANUAL_INDEX
             ),
-            {"fan": fan_mode, "htsp": self.setpoint_heat, "clsp": self.setpoint_cool},
+            {
+                "fan": fan_mode,
+                "htsp": self.zone.setpoint_heat,
+                "clsp": self.zone.setpoint_cool,
+            },
         )
-        self.set_hold_mode(activity=ACTIVITY_MANUAL)
+        await self.async_set_hold_mode(activity=ACTIVITY_MANUAL)
 
-    def set_hvac_mode(self, hvac_mode):
+    async def async_set_hvac_mode(self, hvac_mode):
         """Set new target hvac mode."""
         if hvac_mode == HVAC_MODE_HEAT_COOL:
             data = {"mode": "auto"}
@@ -720,13 +945,13 @@ class InfinitudeZone(ClimateEntity):
         else:
             _LOGGER.error("Invalid HVAC mode: {}".format(hvac_mode))
             return
-        self.infinitude.api("/api/config", data)
+        await self._async_write("/api/config", data)
 
     def set_swing_mode(self, swing_mode):
         """Set new target swing operation."""
         raise NotImplementedError
 
-    def set_preset_mode(self, preset_mode):
+    async def async_set_preset_mode(self, preset_mode):
         """Set new preset mode."""
         # Skip if no change
         if preset_mode == self._preset_mode:
@@ -734,7 +959,7 @@ class InfinitudeZone(ClimateEntity):
 
         # For normal schedule, remove all holds
         if preset_mode == PRESET_SCHEDULE:
-            self.set_hold_mode(mode=HOLD_MODE_OFF)
+            await self.async_set_hold_mode(mode=HOLD_MODE_OFF)
 
         # Activity override: Hold new activity until next schedule change
         elif preset_mode in [PRESET_HOME, PRESET_AWAY, PRESET_SLEEP, PRESET_WAKE]:
@@ -746,17 +971,19 @@ class InfinitudeZone(ClimateEntity):
                 activity = ACTIVITY_SLEEP
             elif preset_mode == PRESET_WAKE:
                 activity = ACTIVITY_WAKE
-            self.set_hold_mode(mode=HOLD_MODE_UNTIL, until=None, activity=activity)
+            await self.async_set_hold_mode(
+                mode=HOLD_MODE_UNTIL, until=None, activity=activity
+            )
 
         # Temporary manual override: Switch to manual activity and hold until next schedule change
         elif preset_mode == PRESET_MANUAL_TEMP:
-            self.set_hold_mode(
+            await self.async_set_hold_mode(
                 mode=HOLD_MODE_UNTIL, until=None, activity=ACTIVITY_MANUAL
             )
 
         # Permanent manual override: Switch to manual activity and hold indefinitely
         elif preset_mode == PRESET_MANUAL_PERM:
-            self.set_hold_mode(
+            await self.async_set_hold_mode(
                 mode=HOLD_MODE_INDEFINITE, until=None, activity=ACTIVITY_MANUAL
             )
 
@@ -775,13 +1002,7 @@ class InfinitudeZone(ClimateEntity):
     @property
     def supported_features(self):
         """Return the list of supported features."""
-        baseline_features = SUPPORT_FAN_MODE | SUPPORT_PRESET_MODE
-        if self.hvac_mode == HVAC_MODE_HEAT_COOL:
-            return baseline_features | SUPPORT_TARGET_TEMPERATURE_RANGE
-        elif self.hvac_mode in [HVAC_MODE_HEAT, HVAC_MODE_COOL]:
-            return baseline_features | SUPPORT_TARGET_TEMPERATURE
-        else:
-            return baseline_features
+        return self._supported_features
 
     @property
     def min_temp(self):
@@ -803,7 +1024,7 @@ class InfinitudeZone(ClimateEntity):
         """Return the maximum humidity."""
         return super().max_humidity
 
-    def set_hold_mode(self, **kwargs):
+    async def async_set_hold_mode(self, **kwargs):
         """Update hold mode.
         Used to process various presets and support the legacy set_hold_mode service
         """
@@ -817,12 +1038,12 @@ class InfinitudeZone(ClimateEntity):
         until = kwargs.get("until")
         # Default: Next activity time
         if until is None:
-            until = self.activity_next_start.strftime("%H:%M")
+            until = self.zone.activity_next_start.strftime("%H:%M")
 
         activity = kwargs.get("activity")
         # Default: Current activity
         if activity is None:
-            activity = self.activity_current
+            activity = self.zone.activity_current
 
         if mode == HOLD_MODE_OFF:
             data = {"hold": HOLD_OFF, "holdActivity": "", "otmr": ""}
@@ -834,4 +1055,35 @@ class InfinitudeZone(ClimateEntity):
             _LOGGER.error("Invalid hold mode: {}".format(mode))
             return
 
-        self.infinitude.api("/api/config/zones/zone/{}/".format(self.zone_index), data)
+        await self._async_write(
+            "/api/config/zones/zone/{}/".format(self.zone_index), data
+        )
+
+    async def async_set_schedule(self, week):
+        """Change the periods of the weekly program that differ from week,
+        with a single POST of the changed fields per period"""
+        if self.zone is None:
+            raise ValueError("Zone not retrieved yet")
+        periods = program_changes(self.zone.program, week)
+        changes = {
+            "/api/config/zones/zone/{}/program/day/{}/period/{}/".format(
+                self.zone_index, day, period
+            ): data
+            for (day, period), data in periods.items()
+        }
+        if not changes:
+            _LOGGER.debug("Schedule of %s is unchanged", self.name)
+            return
+        self.coordinator.async_patch_configs(changes)
+        await self.writes.async_write_all(changes)
+
+    def _queue_write(self, path, data):
+        """Queue a config change, showing it in the UI straight away.
+        Infinitude is then checked for it once written."""
+        self.coordinator.async_patch_config(path, data)
+        self.writes.queue(path, data)
+
+    async def _async_write(self, path, data):
+        """Queue a config change and wait until it has been written"""
+        self.coordinator.async_patch_config(path, data)
+        await self.writes.async_write(path, data)
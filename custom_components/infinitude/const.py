@@ -0,0 +1,2 @@
+"""Constants for the Infinitude integration"""
+DOMAIN = "infinitude"
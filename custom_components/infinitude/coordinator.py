@@ -0,0 +1,474 @@
+"""
+Shared polling of an Infinitude proxy for all of its zones
+"""
+from datetime import timedelta
+import asyncio
+import logging
+import re
+import time
+
+import aiohttp
+from homeassistant.core import callback
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util, slugify
+
+from .infinitude import (
+    PATH_CONFIG,
+    InfinitudeUnavailable,
+    find_config_node,
+    patch_config,
+)
+from .snapshot import PARSE_ERRORS, SystemSnapshot
+
+_LOGGER = logging.getLogger(__name__)
+
+# Matches the default polling interval of climate entities
+SCAN_INTERVAL = timedelta(seconds=60)
+
+# Config only changes when settings are edited, energy once per period
+CONFIG_INTERVAL = timedelta(minutes=5)
+ENERGY_INTERVAL = timedelta(hours=1)
+
+# Bounds of the adaptive poll interval, and how long polls stay at the lower
+# bound after a change was written
+MIN_INTERVAL = timedelta(seconds=15)
+MAX_INTERVAL = timedelta(minutes=5)
+WRITE_WINDOW = timedelta(minutes=2)
+
+# Seconds between checks that Infinitude holds a change written to it, and
+# before the change is given up on
+CONFIRM_INTERVAL = 5
+CONFIRM_TIMEOUT = 120
+
+# Config object of a zone, retrieved to confirm the changes below it
+ZONE_PATH = re.compile(r"/api/config/zones/zone/\d+/")
+
+# States of the changes written to each config path
+WRITE_PENDING = "pending"
+WRITE_CONFIRMED = "confirmed"
+WRITE_UNCONFIRMED = "unconfirmed"
+
+# How long the last good snapshot is served while Infinitude is unreachable,
+# before its entities become unavailable
+MAX_STALENESS = timedelta(minutes=30)
+
+# Payloads of the last snapshot are stored at most this often, in seconds
+STORAGE_VERSION = 1
+STORAGE_SAVE_DELAY = 300
+
+
+class InfinitudeDataUpdateCoordinator(DataUpdateCoordinator):
+    """Fetch status, config and energy once per cycle and share a parsed
+    SystemSnapshot of them with every zone"""
+
+    def __init__(
+        self,
+        hass,
+        infinitude,
+        update_interval=SCAN_INTERVAL,
+        telemetry=None,
+        min_interval=MIN_INTERVAL,
+        max_interval=MAX_INTERVAL,
+        system_name=None,
+    ):
+        """An update_interval of None disables polling, for systems that
+        push their updates.  Otherwise the interval adapts to the activity of
+        the system, between min_interval and max_interval.  Snapshots
+        retrieved are sampled into the SystemTelemetry given, if any.
+        system_name prefixes the names of the sensors of the system."""
+        self.infinitude = infinitude
+        self.telemetry = telemetry
+        self.system_name = system_name or "Infinitude {}:{}".format(
+            infinitude.host, infinitude.port
+        )
+
+        # Interval polls start from, its bounds, when a change was last
+        # written, and the number of polls since anything changed
+        self.base_interval = update_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self._written_at = None
+        self._idle_polls = 0
+        self.system_id = slugify("{}_{}".format(infinitude.host, infinitude.port))
+
+        # Changes reflected in the data before Infinitude confirmed them,
+        # by config path: [changes, monotonic time they were POSTed or False]
+        self._patches = {}
+
+        # State of the last change to each config path, and the tasks
+        # checking the ones POSTed, by the config object they retrieve
+        self.write_states = {}
+        self._confirmations = {}
+
+        # Payloads the current snapshot was parsed from
+        self._payloads = None
+
+        # When the current snapshot was last confirmed by Infinitude, and
+        # since when it has been served without being confirmed
+        self.last_success_time = None
+        self.stale_since = None
+
+        # Payloads of the last snapshot, restored at startup
+        self._store = Store(
+            hass, STORAGE_VERSION, "infinitude.{}".format(self.system_id)
+        )
+        self._save_pending = False
+        super().__init__(
+            hass,
+            _LOGGER,
+            name="infinitude {}:{}".format(infinitude.host, infinitude.port),
+            update_interval=update_interval,
+            # Unchanged payloads are returned as the same object, which
+            # skips parsing and state writes in every zone
+            always_update=False,
+        )
+
+    async def _async_update_data(self):
+        profiler = self.infinitude.profiler
+        if profiler is None:
+            return await self._async_poll()
+        with profiler.section("poll", self.system_id):
+            return await self._async_poll()
+
+    async def _async_poll(self):
+        try:
+            payloads = await self.infinitude.async_fetch()
+        except (aiohttp.ClientError, asyncio.TimeoutError, InfinitudeUnavailable) as e:
+            return self._stale_data(e)
+
+        data = self._parse(payloads)
+        self.last_success_time = dt_util.utcnow()
+        self._async_schedule_save()
+        self._adapt_interval(data, self.data)
+        if self.stale_since is not None:
+            self.stale_since = None
+            # Unchanged data would not notify the entities of their recovery
+            if data is self.data:
+                self.async_update_listeners()
+        return data
+
+    def _adapt_interval(self, data, previous):
+        """Poll at the lower bound for a while after a write, faster than
+        usual while a zone is conditioning, and back off exponentially while
+        the system is idle and nothing changes"""
+        if self.base_interval is None:
+            return
+        if (
+            self._written_at is not None
+            and time.monotonic() - self._written_at < WRITE_WINDOW.total_seconds()
+        ):
+            interval = self.min_interval
+            self._idle_polls = 0
+        elif any(zone.conditioning != "idle" for zone in data.zones.values()):
+            interval = self.base_interval / 2
+            self._idle_polls = 0
+        else:
+            if previous is not None and _snapshot_unchanged(data, previous):
+                self._idle_polls = min(self._idle_polls + 1, 10)
+            else:
+                self._idle_polls = 0
+            interval = self.base_interval * 2**self._idle_polls
+        interval = min(max(interval, self.min_interval), self.max_interval)
+        if interval != self.update_interval:
+            _LOGGER.debug("Polling %s every %s", self.name, interval)
+            self.update_interval = interval
+
+    async def async_restore(self):
+        """Show the snapshot stored before the last restart until the first
+        refresh, marked as stale since it was retrieved"""
+        stored = await self._store.async_load()
+        if stored is None:
+            return
+        try:
+            self.data = SystemSnapshot.parse(
+                stored["status"], stored["config"], stored["energy"]
+            )
+        except PARSE_ERRORS as e:
+            _LOGGER.warning("Ignoring the stored Infinitude data: %r", e)
+            return
+        # Changes that fail before the first refresh are undone against these
+        self._payloads = {
+            "status": stored["status"],
+            "config": stored["config"],
+            "energy": stored["energy"],
+        }
+        self.last_success_time = dt_util.parse_datetime(stored["retrieved"])
+        self.stale_since = self.last_success_time
+
+    @callback
+    def _async_schedule_save(self):
+        """Store the payloads of the current snapshot, throttled so that a
+        change on every poll does not mean a write on every poll"""
+        if self._save_pending:
+            return
+        self._save_pending = True
+        self._store.async_delay_save(self._data_to_save, STORAGE_SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self):
+        self._save_pending = False
+        # Unconfirmed changes are left out, the payloads are as retrieved
+        return {
+            "retrieved": self.last_success_time.isoformat(),
+            "status": self._payloads["status"],
+            "config": self._payloads["config"],
+            "energy": self._payloads["energy"],
+        }
+
+    def _stale_data(self, error):
+        """Keep serving the last good snapshot while Infinitude is unreachable,
+        unless there is none or it has become too old"""
+        message = "Unable to retrieve data from Infinitude: {}".format(error)
+        if self.data is None or (
+            dt_util.utcnow() - self.last_success_time > MAX_STALENESS
+        ):
+            raise UpdateFailed(message) from error
+        if self.stale_since is None:
+            _LOGGER.warning("%s, showing the last values retrieved", message)
+            self.stale_since = self.last_success_time
+            # The data itself is unchanged, only its staleness is news
+            self.async_update_listeners()
+        else:
+            _LOGGER.debug(message)
+        return self.data
+
+    @callback
+    def async_push(self, responses):
+        """Update from endpoint responses pushed by Infinitude or a relay,
+        keyed by endpoint path.  Returns False if they are not enough to
+        build a snapshot yet."""
+        profiler = self.infinitude.profiler
+        if profiler is None:
+            return self._push(responses)
+        with profiler.section("poll", self.system_id):
+            return self._push(responses)
+
+    def _push(self, responses):
+        # A malformed update is rejected before it replaces the last good one
+        payloads = self.infinitude.ingest(responses, validate=_validate)
+        if payloads is None:
+            return False
+        data = self._parse(payloads)
+        self.last_success_time = dt_util.utcnow()
+        self.stale_since = None
+        self._async_schedule_save()
+        self.async_set_updated_data(data)
+        return True
+
+    def _parse(self, payloads, force=False):
+        # Nothing to parse when Infinitude reported no changes
+        if payloads is self._payloads and not self._patches and not force:
+            return self.data
+        # Readings are only new when the status was retrieved again, not
+        # when the same payloads are parsed with other patches
+        new_status = (
+            self._payloads is None or payloads["status"] is not self._payloads["status"]
+        )
+        self._payloads = payloads
+
+        start = time.perf_counter()
+        config = payloads["config"]
+        if self._patches:
+            config = self._reconcile(config)
+        snapshot = SystemSnapshot.parse(
+            payloads["status"], config, payloads["energy"], self.data
+        )
+        self.infinitude.metrics.record_parse(time.perf_counter() - start)
+        if self.telemetry is not None and new_status:
+            self.telemetry.record(time.time(), snapshot)
+        return snapshot
+
+    @callback
+    def async_patch_config(self, path, data):
+        """Reflect a config change in the shared data before it is written,
+        so entities show it without waiting for the next poll"""
+        self.async_patch_configs({path: data})
+
+    @callback
+    def async_patch_configs(self, changes):
+        """Reflect changes to several config paths at once, parsing the
+        patched data a single time"""
+        config = None if self.data is None else self.data.config
+        for path, data in changes.items():
+            patch = self._patches.setdefault(path, [{}, False])
+            patch[0].update(data)
+            patch[1] = False
+            self.write_states[path] = WRITE_PENDING
+            if config is not None:
+                config = patch_config(config, path, data)
+        if self.data is not None:
+            self.async_set_updated_data(
+                SystemSnapshot.parse(
+                    self.data.status, config, self.data.energy_stats, self.data
+                )
+            )
+
+    @callback
+    def async_patch_written(self, path):
+        """Mark a config change as POSTed, and start checking that Infinitude
+        holds it.  Polls speed up to show the thermostat picking it up."""
+        if path in self._patches:
+            self._patches[path][1] = time.monotonic()
+            # A check already running for the zone covers this change too
+            target = _confirmation_path(path)
+            if target not in self._confirmations:
+                self._confirmations[target] = self.hass.async_create_task(
+                    self._async_confirm(target)
+                )
+        self._written_at = time.monotonic()
+        if self.base_interval is not None and self.update_interval != self.min_interval:
+            self.update_interval = self.min_interval
+            self._schedule_refresh()
+
+    async def _async_confirm(self, target):
+        """Retrieve the config object of a zone, or the whole config for system
+        settings, until it shows every change POSTed to it.  Each request
+        covers all the changes of the zone, however many paths they span."""
+        try:
+            while self._written_paths(target):
+                try:
+                    node = await self.infinitude.async_config_node(target)
+                except (
+                    aiohttp.ClientError,
+                    asyncio.TimeoutError,
+                    InfinitudeUnavailable,
+                    ValueError,
+                ) as e:
+                    _LOGGER.debug("Unable to check the changes to %s: %s", target, e)
+                else:
+                    if isinstance(node, dict) and self._payloads is not None:
+                        if not self._confirm(target, node):
+                            # Only stored data was shown so far, the next
+                            # poll retrieves the whole config to compare
+                            await self.async_request_refresh()
+
+                now = time.monotonic()
+                expired = [
+                    path
+                    for path in self._written_paths(target)
+                    if now - self._patches[path][1] >= CONFIRM_TIMEOUT
+                ]
+                if expired:
+                    _LOGGER.warning(
+                        "Infinitude did not show the changes to %s after %ss, "
+                        "showing its values instead",
+                        expired,
+                        CONFIRM_TIMEOUT,
+                    )
+                    self.infinitude.metrics.unconfirmed_writes += len(expired)
+                    for path in expired:
+                        self._finish_write(path, WRITE_UNCONFIRMED)
+                    self._async_show_retrieved()
+                if self._written_paths(target):
+                    await asyncio.sleep(CONFIRM_INTERVAL)
+        finally:
+            self._confirmations.pop(target, None)
+
+    def _confirm(self, target, node):
+        """Splice a config object retrieved on its own into the cached config,
+        and drop the patches it confirms.  Returns False if there is no
+        config retrieved from Infinitude to splice it into yet."""
+        payloads = self.infinitude.update_config(target, node)
+        if payloads is None:
+            return False
+        for path in self._written_paths(target):
+            changes = self._patches[path][0]
+            if not _mismatched(find_config_node(payloads["config"], path), changes):
+                self._finish_write(path, WRITE_CONFIRMED)
+        # Changes not shown yet are applied again on top
+        self.async_set_updated_data(self._parse(payloads))
+        return True
+
+    def _written_paths(self, target):
+        """Paths of the POSTed changes that retrieving target confirms"""
+        return [
+            path
+            for path, (_, written_at) in self._patches.items()
+            if written_at and _confirmation_path(path) == target
+        ]
+
+    @callback
+    def async_patch_failed(self, paths):
+        """Drop config changes that could not be POSTed, showing the values
+        last retrieved from Infinitude again"""
+        paths = [path for path in paths if path in self._patches]
+        if not paths:
+            return
+        _LOGGER.warning("Unable to write %s, showing Infinitude's values", paths)
+        for path in paths:
+            self._finish_write(path, WRITE_UNCONFIRMED)
+        self._async_show_retrieved()
+
+    @callback
+    def _async_show_retrieved(self):
+        """Parse the payloads retrieved last again, with the patches left"""
+        if self._payloads is not None:
+            self.async_set_updated_data(self._parse(self._payloads, force=True))
+
+    def _finish_write(self, path, state):
+        self._patches.pop(path, None)
+        self.write_states[path] = state
+
+    def _reconcile(self, config):
+        """Compare POSTed changes against a freshly fetched config, and keep
+        applying the ones that have not been POSTed or fetched yet"""
+        refreshed = PATH_CONFIG in self.infinitude.refreshed
+        for path, (changes, written) in list(self._patches.items()):
+            if not (written and refreshed):
+                config = patch_config(config, path, changes)
+                continue
+            mismatched = _mismatched(find_config_node(config, path), changes)
+            if mismatched:
+                _LOGGER.warning(
+                    "Infinitude did not apply %s to %s, showing its values instead",
+                    mismatched,
+                    path,
+                )
+                self.infinitude.metrics.unconfirmed_writes += 1
+            self._finish_write(
+                path, WRITE_UNCONFIRMED if mismatched else WRITE_CONFIRMED
+            )
+        return config
+
+
+def _snapshot_unchanged(data, previous):
+    """Whether anything but the thermostat clock changed between snapshots"""
+    return data is previous or (
+        data.zones == previous.zones
+        and data.hvac_mode == previous.hvac_mode
+        and data.outdoor_temperature == previous.outdoor_temperature
+    )
+
+
+def _validate(payloads):
+    """Raise one of PARSE_ERRORS unless the payloads can be parsed"""
+    SystemSnapshot.parse(payloads["status"], payloads["config"], payloads["energy"])
+
+
+def _confirmation_path(path):
+    """Config object retrieved to confirm a change to path: its zone, or the
+    whole config for system settings"""
+    match = ZONE_PATH.match(path)
+    return match.group(0) if match else PATH_CONFIG
+
+
+def _mismatched(node, changes):
+    """Changes that a config object does not hold"""
+    return {
+        key: value
+        for key, value in changes.items()
+        if node is None or not _config_equal(node.get(key), value)
+    }
+
+
+def _config_equal(current, value):
+    """Compare a config value as returned by Infinitude with a POSTed one"""
+    if isinstance(current, list):
+        current = current[0] if current else None
+    if current in (None, {}):
+        return value in (None, "")
+    try:
+        return float(current) == float(value)
+    except (TypeError, ValueError):
+        return str(current) == str(value)
@@ -0,0 +1,60 @@
+"""
+Energy usage reported by /energy.json, parsed into a compact table
+"""
+from array import array
+
+# Period holding the usage of the current day, and the one of the day before
+PERIOD_TODAY = "day1"
+PERIOD_YESTERDAY = "day2"
+
+
+class EnergyUsage:
+    """Usage of each source over each period (days, months and years),
+    stored as a single array of integers, one row per period"""
+
+    __slots__ = ("periods", "sources", "values")
+
+    def __init__(self, energy_stats):
+        periods = energy_stats["energy"][0]["usage"][0]["period"]
+        self.periods = {period["id"]: row for row, period in enumerate(periods)}
+        # Sources are the same for every period, in the order of the first one
+        self.sources = {}
+        for source in periods[0] if periods else ():
+            if source != "id":
+                self.sources[source] = len(self.sources)
+        width = len(self.sources)
+        self.values = array("l", [0]) * (len(periods) * width)
+        for row, period in enumerate(periods):
+            for source, column in self.sources.items():
+                value = period.get(source)
+                if value:
+                    self.values[row * width + column] = int(value[0])
+
+    def value(self, period, source):
+        """Usage of a source over a period, None if it is not reported"""
+        row = self.periods.get(period)
+        column = self.sources.get(source)
+        if row is None or column is None:
+            return None
+        return self.values[row * len(self.sources) + column]
+
+    def used(self, source):
+        """Whether any usage of a source is reported, over any period"""
+        column = self.sources.get(source)
+        if column is None:
+            return False
+        width = len(self.sources)
+        return any(self.values[column::width])
+
+    def delta(self, previous, source):
+        """Usage of a source since the previous report.  When the day rolled
+        over in between, the rest of the previous day is read from yesterday's
+        period, so no usage is lost between two reports."""
+        today = self.value(PERIOD_TODAY, source)
+        before = previous.value(PERIOD_TODAY, source)
+        if today is None or before is None:
+            return 0
+        if today >= before:
+            return today - before
+        yesterday = self.value(PERIOD_YESTERDAY, source) or 0
+        return max(yesterday - before, 0) + today
@@ -0,0 +1,568 @@
+"""
+Client for the Infinitude proxy API
+"""
+from urllib import parse
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import time
+
+import aiohttp
+
+from .metrics import InfinitudeMetrics
+
+# Decodes bytes directly and several times faster, shipped with Home Assistant
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_LOGGER = logging.getLogger(__name__)
+
+# Seconds to wait for Infinitude to answer a single request
+DEFAULT_TIMEOUT = 10
+
+# Attempts made for a GET before giving up, and the base delay in seconds
+# between them, doubled after each attempt and jittered
+RETRY_ATTEMPTS = 3
+RETRY_BACKOFF = 0.5
+
+# Consecutive failed requests that open the circuit breaker, and seconds
+# before a single request is let through again to probe the proxy
+BREAKER_THRESHOLD = 3
+BREAKER_COOLDOWN = 60
+
+# Requests in flight at once, unless a semaphore is shared between clients
+MAX_CONCURRENT_REQUESTS = 8
+
+# Seconds to wait for further changes before writing them to Infinitude
+WRITE_DELAY = 0.5
+
+# Endpoints retrieved on each poll
+PATH_STATUS = "/api/status"
+PATH_CONFIG = "/api/config"
+PATH_ENERGY = "/energy.json"
+PUSH_PATHS = (PATH_STATUS, PATH_CONFIG, PATH_ENERGY)
+
+# Parts of the config kept after decoding it, for the system and each zone.
+# Activities and programs are kept whole, since changes are POSTed by index.
+CONFIG_KEYS = ("mode", "cfgem")
+ZONE_CONFIG_KEYS = (
+    "id",
+    "name",
+    "enabled",
+    "hold",
+    "holdActivity",
+    "otmr",
+    "activities",
+    "program",
+)
+
+
+def decode_json(raw):
+    """Decode a response body, straight from bytes with orjson.  The standard
+    library is faster from a string, as it otherwise detects the encoding."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw.decode())
+
+
+def extract_config(payload):
+    """Keep only the parts of a /api/config response that are used, so the
+    rest of the tree can be freed straight away"""
+    data = payload["data"]
+    extracted = {key: data[key] for key in CONFIG_KEYS if key in data}
+    extracted["zones"] = [
+        {
+            "zone": [
+                {key: zone[key] for key in ZONE_CONFIG_KEYS if key in zone}
+                for zone in data["zones"][0]["zone"]
+            ]
+        }
+    ]
+    return {"data": extracted}
+
+
+def _config_segments(path):
+    """Split a config path such as /api/config/zones/zone/0/ into its keys"""
+    return [segment for segment in path[len(PATH_CONFIG) :].split("/") if segment]
+
+
+def _config_value(value):
+    """Represent a POSTed value the way Infinitude returns it"""
+    if value == "":
+        return [{}]
+    return [str(value)]
+
+
+def _patch_node(node, segments, values):
+    if not segments:
+        patched = dict(node)
+        patched.update(values)
+        return patched
+    if isinstance(node, list):
+        # Single values and objects are wrapped in lists, unless indexed directly
+        patched = list(node)
+        if segments[0].isdigit():
+            index = int(segments[0])
+            patched[index] = _patch_node(node[index], segments[1:], values)
+        else:
+            patched[0] = _patch_node(node[0], segments, values)
+        return patched
+    patched = dict(node)
+    patched[segments[0]] = _patch_node(node[segments[0]], segments[1:], values)
+    return patched
+
+
+def patch_config(config, path, data):
+    """Return a copy of the config with a change POSTed to path applied.
+    Only the containers along the path are copied, everything else is shared
+    with the original config."""
+    values = {key: _config_value(value) for key, value in data.items()}
+    return _patch_node(config, _config_segments(path), values)
+
+
+def _replace_node(node, segments, value):
+    if not segments:
+        return value
+    if isinstance(node, list):
+        patched = list(node)
+        if segments[0].isdigit():
+            index = int(segments[0])
+            patched[index] = _replace_node(node[index], segments[1:], value)
+        else:
+            patched[0] = _replace_node(node[0], segments, value)
+        return patched
+    patched = dict(node)
+    patched[segments[0]] = _replace_node(node[segments[0]], segments[1:], value)
+    return patched
+
+
+def replace_config_node(config, path, node):
+    """Return a copy of the config with the object at path replaced by node,
+    sharing everything else with the original config"""
+    return _replace_node(config, _config_segments(path), node)
+
+
+def find_config_node(config, path):
+    """Return the config object that a change POSTed to path applies to"""
+    node = config
+    try:
+        for segment in _config_segments(path):
+            if isinstance(node, list) and not segment.isdigit():
+                node = node[0]
+            node = node[int(segment)] if segment.isdigit() else node[segment]
+    except (IndexError, KeyError, TypeError):
+        return None
+    return node
+
+
+class InfinitudeUnavailable(Exception):
+    """Raised instead of requesting Infinitude while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """Stop sending requests to a proxy that keeps failing, so that callers
+    fail straight away rather than each waiting for their own timeout.
+
+    After the cooldown a single request is allowed through: its success
+    closes the breaker again, its failure reopens it for another cooldown.
+    """
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def check(self):
+        """Raise InfinitudeUnavailable if a request may not be sent now.
+        Returns True if the request is the single one let through after the
+        cooldown, which must be ended by success, failure or end_probe."""
+        if self.opened_at is None:
+            return False
+        remaining = self.opened_at + self.cooldown - time.monotonic()
+        if remaining > 0 or self._probing:
+            raise InfinitudeUnavailable(
+                "Infinitude failed {} consecutive requests, retrying in {:.0f}s".format(
+                    self.failures, max(remaining, 0)
+                )
+            )
+        self._probing = True
+        return True
+
+    def end_probe(self):
+        """Let another request through if the probe ended without an answer,
+        such as when it was cancelled"""
+        self._probing = False
+
+    def success(self):
+        if self.opened_at is not None:
+            _LOGGER.info("Infinitude is responding again")
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def failure(self):
+        self.failures += 1
+        if self._probing or (
+            self.opened_at is None and self.failures >= self.threshold
+        ):
+            if self.opened_at is None:
+                _LOGGER.warning(
+                    "Infinitude failed %s consecutive requests, pausing them for %ss",
+                    self.failures,
+                    self.cooldown,
+                )
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+
+class Infinitude:
+    def __init__(
+        self,
+        session,
+        host,
+        port,
+        timeout=DEFAULT_TIMEOUT,
+        refresh_intervals=None,
+        semaphore=None,
+    ):
+        """The aiohttp session is owned by the caller, one per Infinitude host,
+        so that keep-alive connections are reused between polls.
+
+        refresh_intervals maps an endpoint path to the minimum number of seconds
+        between two requests to it.  Endpoints without an interval are requested
+        on every poll.
+
+        A semaphore shared by the clients of several systems caps the requests
+        they have in flight together.
+        """
+        self.session = session
+        self.host = host
+        self.port = port
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.semaphore = semaphore or asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        self.refresh_intervals = refresh_intervals or {}
+
+        # Fingerprint, decoded payload and monotonic retrieval time of the
+        # last response from each endpoint
+        self._fingerprints = {}
+        self._payloads = {}
+        self._fetched_at = {}
+        self.data = None
+
+        # Endpoints actually requested during the last poll
+        self.refreshed = set()
+
+        self.metrics = InfinitudeMetrics()
+        self.breaker = CircuitBreaker()
+
+        # RequestCapture recording every response received, if any
+        self.capture = None
+
+        # CycleProfiler of the polls and writes, while one is requested
+        self.profiler = None
+
+    async def request(self, path, req_data=None, retry=True):
+        """Perform a request and return the raw response body.
+
+        GETs that time out or fail to connect are retried with a jittered
+        exponential backoff, unless retry is False.  POSTs are not, as they
+        may have been applied.  While the circuit breaker is open,
+        InfinitudeUnavailable is raised without sending anything.
+        """
+        probing = self.breaker.check()
+        try:
+            return await self._request_with_retries(path, req_data, retry)
+        finally:
+            if probing:
+                self.breaker.end_probe()
+
+    async def _request_with_retries(self, path, req_data, retry):
+        attempts = RETRY_ATTEMPTS if req_data is None and retry else 1
+        for attempt in range(1, attempts + 1):
+            try:
+                async with self.semaphore:
+                    resp_data = await self._request_once(path, req_data)
+            except aiohttp.ClientResponseError as e:
+                # Infinitude answered, retrying would not change its mind
+                if e.status < 500:
+                    self.breaker.success()
+                    raise
+                error = e
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = e
+            else:
+                self.breaker.success()
+                return resp_data
+            if attempt == attempts:
+                break
+            delay = RETRY_BACKOFF * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+            _LOGGER.debug("Retrying %s in %.1fs after %r", path, delay, error)
+            await asyncio.sleep(delay)
+        self.breaker.failure()
+        raise error
+
+    async def _request_once(self, path, req_data):
+        url = "http://{}:{}{}".format(self.host, self.port, path)
+        _LOGGER.debug("%s %s", url, req_data)
+
+        # If data is provided, encode for POSTing
+        method = "GET" if req_data is None else "POST"
+        metrics = self.metrics.request(method, path)
+        if req_data is None:
+            req = self.session.get(url, timeout=self.timeout)
+        else:
+            req = self.session.post(
+                url,
+                data=parse.urlencode(req_data),
+                headers={"Content-Type": "application/x-www-form-urlencoded"},
+                timeout=self.timeout,
+            )
+        start = time.perf_counter()
+        try:
+            async with req as response:
+                if self.capture is not None:
+                    self.capture.record(
+                        method,
+                        path,
+                        req_data,
+                        response.status,
+                        await response.read(),
+                        time.perf_counter() - start,
+                    )
+                response.raise_for_status()
+                resp_data = await response.read()
+        except Exception:
+            metrics.errors += 1
+            metrics.record(time.perf_counter() - start)
+            raise
+        metrics.record(time.perf_counter() - start, len(resp_data))
+        return resp_data
+
+    def _is_due(self, path):
+        fetched_at = self._fetched_at.get(path)
+        if fetched_at is None or path not in self._payloads:
+            return True
+        interval = self.refresh_intervals.get(path)
+        return interval is None or time.monotonic() - fetched_at >= interval
+
+    async def api(self, path, req_data=None, retry=True):
+        resp_data = decode_json(await self.request(path, req_data, retry))
+        _LOGGER.debug(resp_data)
+        return resp_data
+
+    async def _async_fetch_changed(self, path):
+        """Retrieve an endpoint, only decoding the response if it differs from
+        the previous one.  Returns the payload and whether it changed.
+        Endpoints that are not yet due for a refresh are not requested at all."""
+        if not self._is_due(path):
+            return self._payloads[path], False
+        raw = await self.request(path)
+        self._fetched_at[path] = time.monotonic()
+        self.refreshed.add(path)
+        fingerprint = hashlib.blake2b(raw, digest_size=16).digest()
+        if fingerprint == self._fingerprints.get(path):
+            return self._payloads[path], False
+        payload = decode_json(raw)
+        if path == PATH_CONFIG:
+            payload = extract_config(payload)
+        _LOGGER.debug(payload)
+        self._fingerprints[path] = fingerprint
+        self._payloads[path] = payload
+        return payload, True
+
+    async def async_status(self, retry=True):
+        status = await self.api(PATH_STATUS, retry=retry)
+        return status
+
+    async def async_config(self):
+        config = await self.api(PATH_CONFIG)
+        return config["data"]
+
+    async def async_energy(self):
+        energy = await self.api(PATH_ENERGY)
+        return energy
+
+    async def async_fetch(self):
+        """Retrieve the full system status, config and energy stats.
+        Each endpoint is requested exactly once, regardless of the number of zones.
+        When none of the responses changed, the previous data is returned as-is,
+        so callers can skip parsing by comparing identity.
+        """
+        self.refreshed = set()
+        results = await asyncio.gather(
+            self._async_fetch_changed(PATH_STATUS),
+            self._async_fetch_changed(PATH_CONFIG),
+            self._async_fetch_changed(PATH_ENERGY),
+        )
+        if self.data is not None and not any(changed for _, changed in results):
+            _LOGGER.debug("No changes reported by Infinitude")
+            return self.data
+        return self._update_data()
+
+    async def async_config_node(self, path):
+        """Retrieve only the config object at path, such as a single zone"""
+        payload = decode_json(await self.request(path))
+        # Objects are wrapped in the same response as the full config
+        if isinstance(payload, dict) and "data" in payload:
+            payload = payload["data"]
+        if isinstance(payload, list) and payload:
+            payload = payload[0]
+        return payload
+
+    def update_config(self, path, node):
+        """Replace the config object at path with one retrieved on its own,
+        returning the data in the same form as async_fetch, or None until
+        every endpoint has been retrieved once"""
+        if any(endpoint not in self._payloads for endpoint in PUSH_PATHS):
+            return None
+        config = self._payloads[PATH_CONFIG]
+        if path.rstrip("/") == PATH_CONFIG:
+            config = extract_config({"data": node})
+        else:
+            config = {"data": replace_config_node(config["data"], path, node)}
+        self._payloads[PATH_CONFIG] = config
+        # The next full config must be decoded again, even if it is unchanged
+        self._fingerprints.pop(PATH_CONFIG, None)
+        self.refreshed = {path}
+        return self._update_data()
+
+    def ingest(self, responses, validate=None):
+        """Accept endpoint responses delivered by push rather than polled,
+        keyed by endpoint path.  Returns the data in the same form as
+        async_fetch, or None until every endpoint has been received once.
+        validate is called with that data before any response is kept, and
+        may raise to reject them."""
+        received = {
+            path: extract_config(payload) if path == PATH_CONFIG else payload
+            for path, payload in responses.items()
+        }
+        payloads = {**self._payloads, **received}
+        complete = all(path in payloads for path in PUSH_PATHS)
+        if complete and validate is not None:
+            validate(_data(payloads))
+
+        self.refreshed = set(received)
+        for path, payload in received.items():
+            self._payloads[path] = payload
+            self._fingerprints.pop(path, None)
+            self._fetched_at[path] = time.monotonic()
+        if not complete:
+            return None
+        return self._update_data()
+
+    def _update_data(self):
+        self.data = _data(self._payloads)
+        return self.data
+
+
+def _data(payloads):
+    """Payloads keyed by endpoint path, in the form async_fetch returns"""
+    return {
+        "status": payloads[PATH_STATUS],
+        "config": payloads[PATH_CONFIG]["data"],
+        "energy": payloads[PATH_ENERGY],
+    }
+
+
+class WriteQueue:
+    """Coalesce config changes made in quick succession.
+
+    Changes are collected per config path until no new change has been queued
+    for the debounce delay.  Each path is then POSTed once, in the order it was
+    first queued, with later values replacing earlier ones for the same key.
+    Flushes run one at a time, so a value never overtakes a newer one on its
+    way to Infinitude.
+    """
+
+    def __init__(self, infinitude, delay=WRITE_DELAY, on_written=None, on_failed=None):
+        """on_written is called with the path of each change once it is POSTed,
+        and on_failed with the paths of the changes that could not be"""
+        self.infinitude = infinitude
+        self.delay = delay
+        self.on_written = on_written
+        self.on_failed = on_failed
+        self._pending = {}
+        self._waiters = []
+        self._flush_handle = None
+        self._flush_lock = asyncio.Lock()
+        # Flushes started by the debounce timer, referenced until they are done
+        self._flushes = set()
+
+    def queue(self, path, data):
+        """Queue a change, to be written along with any that follow it"""
+        self._pending.setdefault(path, {}).update(data)
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        self._flush_handle = asyncio.get_running_loop().call_later(
+            self.delay, self._start_flush
+        )
+
+    def _start_flush(self):
+        self._flush_handle = None
+        flush = asyncio.get_running_loop().create_task(self.async_flush())
+        self._flushes.add(flush)
+        flush.add_done_callback(self._flushes.discard)
+
+    async def async_write(self, path, data):
+        """Queue a change and wait until it has been written"""
+        await self.async_write_all({path: data})
+
+    async def async_write_all(self, changes):
+        """Queue changes to several paths and wait until all have been written"""
+        for path, data in changes.items():
+            self.queue(path, data)
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        await waiter
+
+    async def async_flush(self):
+        """Write all pending changes immediately"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        # Changes queued while a flush is POSTing wait for it to finish
+        async with self._flush_lock:
+            pending, self._pending = self._pending, {}
+            waiters, self._waiters = self._waiters, []
+            error = None
+            if pending:
+                profiler = self.infinitude.profiler
+                if profiler is None:
+                    error = await self._async_post(pending)
+                else:
+                    with profiler.section("write"):
+                        error = await self._async_post(pending)
+        for waiter in waiters:
+            if waiter.done():
+                continue
+            if error is None:
+                waiter.set_result(None)
+            else:
+                waiter.set_exception(error)
+
+    async def _async_post(self, pending):
+        """POST each path in turn, returning the error that stopped them"""
+        paths = list(pending)
+        for index, path in enumerate(paths):
+            try:
+                await self.infinitude.api(path, pending[path])
+            except Exception as e:  # Reported to every caller waiting on the write
+                if self.on_failed is not None:
+                    # Paths changed again since are left to the next flush
+                    failed = [p for p in paths[index:] if p not in self._pending]
+                    if failed:
+                        self.on_failed(failed)
+                return e
+            if self.on_written is not None:
+                self.on_written(path)
+        return None
@@ -0,0 +1,97 @@
+"""
+Request and parsing metrics of an Infinitude client
+"""
+from bisect import bisect_left
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class RequestMetrics:
+    """Counters for one method and path.  Recording a request only updates a
+    handful of numbers, so it can stay on the hot path."""
+
+    __slots__ = ("count", "errors", "histogram", "total_time", "last_time", "size")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        # Requests per latency bucket, the last one counting those over 10s
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total_time = 0.0
+        self.last_time = None
+        self.size = None  # Bytes in the last response
+
+    def record(self, elapsed, size=None):
+        self.count += 1
+        self.histogram[bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+        self.total_time += elapsed
+        self.last_time = elapsed
+        if size is not None:
+            self.size = size
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "mean_ms": round(self.total_time / self.count * 1000, 1)
+            if self.count
+            else None,
+            "last_ms": round(self.last_time * 1000, 1)
+            if self.last_time is not None
+            else None,
+            "last_size": self.size,
+            "histogram": {
+                "le_{}".format(bound): count
+                for bound, count in zip(LATENCY_BUCKETS + ("inf",), self.histogram)
+            },
+        }
+
+
+class InfinitudeMetrics:
+    def __init__(self):
+        # RequestMetrics by (method, path)
+        self.requests = {}
+        self.parse_count = 0
+        self.parse_total_time = 0.0
+        self.parse_last_time = None
+        # Config changes that Infinitude did not show in time after a POST
+        self.unconfirmed_writes = 0
+
+    def request(self, method, path):
+        key = (method, path)
+        metrics = self.requests.get(key)
+        if metrics is None:
+            metrics = self.requests[key] = RequestMetrics()
+        return metrics
+
+    def record_parse(self, elapsed):
+        self.parse_count += 1
+        self.parse_total_time += elapsed
+        self.parse_last_time = elapsed
+
+    @property
+    def request_count(self):
+        return sum(m.count for m in self.requests.values())
+
+    @property
+    def error_count(self):
+        return sum(m.errors for m in self.requests.values())
+
+    def as_dict(self):
+        return {
+            "requests": {
+                "{} {}".format(method, path): metrics.as_dict()
+                for (method, path), metrics in sorted(self.requests.items())
+            },
+            "unconfirmed_writes": self.unconfirmed_writes,
+            "parse": {
+                "count": self.parse_count,
+                "mean_ms": round(self.parse_total_time / self.parse_count * 1000, 2)
+                if self.parse_count
+                else None,
+                "last_ms": round(self.parse_last_time * 1000, 2)
+                if self.parse_last_time is not None
+                else None,
+            },
+        }
@@ -0,0 +1,148 @@
+"""
+Profiling of poll cycles and writes, started on demand by the profile service
+"""
+import asyncio
+import collections
+import contextlib
+import cProfile
+import io
+import os
+import pstats
+import tracemalloc
+
+# Functions and allocation sites listed in a report
+TOP_FUNCTIONS = 50
+TOP_ALLOCATIONS = 25
+
+# Seconds after which profiling stops, whether or not every system was polled
+DEFAULT_TIMEOUT = 600
+
+# Frames kept per allocation, enough to reach the integration from the
+# libraries it calls
+TRACE_FRAMES = 25
+
+# Allocations are attributed to the integration's own code, other than the
+# profiler's
+INTEGRATION_DIR = os.path.dirname(os.path.abspath(__file__))
+INTEGRATION_FRAMES = (
+    tracemalloc.Filter(True, os.path.join(INTEGRATION_DIR, "*"), all_frames=True),
+    tracemalloc.Filter(False, __file__),
+)
+
+
+class CycleProfiler:
+    """Run cProfile and tracemalloc around the next poll cycles of some
+    systems, and the writes made to them meanwhile.
+
+    A single profiler is shared by all the systems, as Python allows only one
+    to be enabled at a time.  Sections may overlap, such as a write during a
+    poll, so it is enabled while at least one is running.  cProfile sees every
+    function run by the event loop in that time.  tracemalloc traces every
+    allocation until the profiler is done, but only those made from the
+    integration are reported.
+    """
+
+    def __init__(self, system_ids, cycles, on_done, timeout=DEFAULT_TIMEOUT):
+        """on_done is called with the profiler once every system has been
+        polled cycles times, or after timeout seconds, whichever comes first.
+        Must be created in the event loop."""
+        self.system_ids = set(system_ids)
+        self.cycles = cycles
+        self.on_done = on_done
+        self.profile = cProfile.Profile()
+        # Sections run, by kind, and polls of each system
+        self.counts = collections.Counter()
+        self.polls = collections.Counter()
+        self.snapshot = None
+        self.done = False
+        self._running = 0
+        # Tracing started elsewhere is left running
+        self._started_tracing = not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start(TRACE_FRAMES)
+        # Systems polled rarely, or pushing nothing, must not keep tracing on
+        self._deadline = asyncio.get_running_loop().call_later(timeout, self._finish)
+
+    @contextlib.contextmanager
+    def section(self, kind, system_id=None):
+        """Profile a poll or write of a system"""
+        if self.done:
+            yield
+            return
+        if self._running == 0:
+            self.profile.enable()
+        self._running += 1
+        try:
+            yield
+        finally:
+            self._running -= 1
+            if self._running == 0:
+                self.profile.disable()
+            self.counts[kind] += 1
+            if kind == "poll":
+                self.polls[system_id] += 1
+            if not self.done and all(
+                self.polls[system] >= self.cycles for system in self.system_ids
+            ):
+                self._finish()
+
+    def _finish(self):
+        if self.done:
+            return
+        self.done = True
+        self._deadline.cancel()
+        self.profile.disable()
+        self.snapshot = tracemalloc.take_snapshot().filter_traces(INTEGRATION_FRAMES)
+        if self._started_tracing:
+            tracemalloc.stop()
+        self.on_done(self)
+
+    def report(self):
+        """Functions sorted by cumulative time, then the sites holding the
+        most memory allocated while profiling"""
+        out = io.StringIO()
+        out.write(
+            "Profiled {} polls and {} writes\n\n".format(
+                self.counts["poll"], self.counts["write"]
+            )
+        )
+        stats = pstats.Stats(self.profile, stream=out)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(TOP_FUNCTIONS)
+
+        out.write(
+            "Top {} allocation sites of the integration\n\n".format(TOP_ALLOCATIONS)
+        )
+        for (filename, lineno), (size, count) in self.allocation_sites():
+            out.write(
+                "{}:{}: size={:.1f} KiB, count={}\n".format(
+                    filename, lineno, size / 1024, count
+                )
+            )
+        return out.getvalue()
+
+    def allocation_sites(self):
+        """Memory still held, by the last line of the integration on the way
+        to each allocation, largest first.  Allocations made by libraries are
+        charged to the line calling them."""
+        sites = collections.defaultdict(lambda: [0, 0])
+        for trace in self.snapshot.traces:
+            # Frames are ordered from the oldest to the most recent
+            for frame in reversed(trace.traceback):
+                if frame.filename.startswith(INTEGRATION_DIR):
+                    # Including what the profiler's own bookkeeping called
+                    if frame.filename == __file__:
+                        break
+                    site = sites[frame.filename, frame.lineno]
+                    site[0] += trace.size
+                    site[1] += 1
+                    break
+        return sorted(sites.items(), key=lambda site: site[1][0], reverse=True)[
+            :TOP_ALLOCATIONS
+        ]
+
+    def write(self, path):
+        """Write the report to path, and the raw stats next to it for other
+        tools, such as snakeviz"""
+        with open(path, "w") as report:
+            report.write(self.report())
+        self.profile.dump_stats("{}.prof".format(os.path.splitext(path)[0]))
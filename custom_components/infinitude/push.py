@@ -0,0 +1,76 @@
+"""
+Endpoint receiving status and config updates pushed by Infinitude or a relay
+"""
+from http import HTTPStatus
+import logging
+
+from homeassistant.components.http import HomeAssistantView
+from homeassistant.core import callback
+
+from .const import DOMAIN
+from .infinitude import PATH_CONFIG, PATH_ENERGY, PATH_STATUS
+from .snapshot import PARSE_ERRORS
+
+_LOGGER = logging.getLogger(__name__)
+
+# Keys of a pushed update, and the endpoint whose response each one carries
+PUSH_KEYS = {
+    "status": PATH_STATUS,
+    "config": PATH_CONFIG,
+    "energy": PATH_ENERGY,
+}
+
+
+@callback
+def async_register_push(hass, coordinator):
+    """Accept pushed updates for the system polled by the coordinator"""
+    systems = hass.data.setdefault(DOMAIN, {}).setdefault("push", {})
+    if not systems:
+        hass.http.register_view(InfinitudePushView)
+    systems[coordinator.system_id] = coordinator
+
+
+class InfinitudePushView(HomeAssistantView):
+    """Receive the responses Infinitude would give to a poll, as soon as the
+    thermostat uploads them.
+
+    The body is a JSON object with any of the keys 'status', 'config' and
+    'energy', holding the responses of /api/status, /api/config and
+    /energy.json respectively.
+    """
+
+    url = "/api/infinitude/{system_id}"
+    name = "api:infinitude:push"
+
+    async def post(self, request, system_id):
+        hass = request.app["hass"]
+        coordinator = hass.data[DOMAIN]["push"].get(system_id)
+        if coordinator is None:
+            return self.json_message(
+                "Unknown Infinitude system: {}".format(system_id),
+                HTTPStatus.NOT_FOUND,
+            )
+
+        try:
+            body = await request.json()
+        except ValueError:
+            return self.json_message("Invalid JSON", HTTPStatus.BAD_REQUEST)
+        if not isinstance(body, dict):
+            return self.json_message("Expected a JSON object", HTTPStatus.BAD_REQUEST)
+        responses = {path: body[key] for key, path in PUSH_KEYS.items() if key in body}
+        if not responses:
+            return self.json_message(
+                "Expected any of: {}".format(", ".join(PUSH_KEYS)),
+                HTTPStatus.BAD_REQUEST,
+            )
+
+        _LOGGER.debug("Pushed update for %s: %s", system_id, list(responses))
+        try:
+            complete = coordinator.async_push(responses)
+        except PARSE_ERRORS as e:
+            return self.json_message(
+                "Unable to parse update: {}".format(e), HTTPStatus.BAD_REQUEST
+            )
+        if not complete:
+            return self.json_message("Waiting for a full update", HTTPStatus.ACCEPTED)
+        return self.json_message("OK")
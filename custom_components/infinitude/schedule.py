@@ -0,0 +1,104 @@
+"""
+Weekly program of a zone, compiled into a sorted timeline for fast lookups,
+and diffed against a new program to write only the periods that change
+"""
+from bisect import bisect_left
+import datetime
+
+# Program day names, in the order of datetime.weekday()
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+
+class WeeklySchedule:
+    """Enabled periods of a zone program, keyed by minute of the week.
+    Compile once per program, then look up any local time with a binary search."""
+
+    __slots__ = ("starts", "activities")
+
+    def __init__(self, program):
+        periods = []
+        for day in program["day"]:
+            day_offset = DAYS.index(day["id"]) * MINUTES_PER_DAY
+            for period in day["period"]:
+                if period["enabled"][0] == "off":
+                    continue
+                period_hh, period_mm = period["time"][0].split(":")
+                start = day_offset + int(period_hh) * 60 + int(period_mm)
+                periods.append((start, period["activity"][0]))
+        periods.sort(key=lambda p: p[0])
+        self.starts = [start for start, _ in periods]
+        self.activities = [activity for _, activity in periods]
+
+    def lookup(self, dt):
+        """Return the scheduled activity and its start, and the next activity and
+        its start, at the local time dt.  The scheduled activity is the last period
+        that started strictly before dt, wrapping around to the previous week."""
+        if not self.starts:
+            return None, None, None, None
+
+        week_start = datetime.datetime(dt.year, dt.month, dt.day) - datetime.timedelta(
+            days=dt.weekday()
+        )
+        minute = (dt - week_start) / datetime.timedelta(minutes=1)
+        index = bisect_left(self.starts, minute)
+
+        # Periods before the first one of the week belong to the previous week,
+        # periods after the last one to the next week
+        scheduled_start = self.starts[index - 1]
+        if index == 0:
+            scheduled_start -= MINUTES_PER_WEEK
+        if index < len(self.starts):
+            next_index, next_start = index, self.starts[index]
+        else:
+            next_index, next_start = 0, self.starts[0] + MINUTES_PER_WEEK
+
+        return (
+            self.activities[index - 1],
+            week_start + datetime.timedelta(minutes=scheduled_start),
+            self.activities[next_index],
+            week_start + datetime.timedelta(minutes=next_start),
+        )
+
+
+def program_changes(program, week):
+    """Fields of the periods of a zone program that differ from week, by day
+    and period index.
+
+    week maps day names to the periods of that day in order, each a dict of
+    time, activity and enabled.  Periods of a day beyond those given are
+    disabled, while days that are not given are left as they are.
+    """
+    changes = {}
+    for day_index, day in enumerate(program["day"]):
+        periods = week.get(day["id"])
+        if periods is None:
+            continue
+        if len(periods) > len(day["period"]):
+            raise ValueError(
+                "{} has only {} periods".format(day["id"], len(day["period"]))
+            )
+        times = [period["time"] for period in periods]
+        if times != sorted(times):
+            raise ValueError("Periods of {} are not in order".format(day["id"]))
+
+        for period_index, current in enumerate(day["period"]):
+            if period_index < len(periods):
+                period = periods[period_index]
+                values = {
+                    "time": period["time"],
+                    "activity": period["activity"],
+                    "enabled": "on" if period.get("enabled", True) else "off",
+                }
+            else:
+                values = {"enabled": "off"}
+            changed = {
+                key: value
+                for key, value in values.items()
+                if current.get(key, [None])[0] != value
+            }
+            if changed:
+                changes[day_index, period_index] = changed
+    return changes
@@ -0,0 +1,361 @@
+"""
+Sensors for an Infinitude system, set up by the climate platform
+"""
+from datetime import timedelta
+
+from homeassistant.components.sensor import (
+    RestoreSensor,
+    SensorDeviceClass,
+    SensorEntity,
+    SensorStateClass,
+)
+from homeassistant.const import (
+    MATCH_ALL,
+    PERCENTAGE,
+    UnitOfEnergy,
+    UnitOfInformation,
+    UnitOfTemperature,
+    UnitOfTime,
+    UnitOfVolumeFlowRate,
+)
+from homeassistant.core import callback
+from homeassistant.helpers.entity import EntityCategory
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+
+# Metrics are kept in memory, so reading them costs nothing
+SCAN_INTERVAL = timedelta(seconds=30)
+
+# Telemetry of the system: snapshot field, label, device class, unit
+SYSTEM_SENSORS = (
+    ("outdoor_temperature", "outdoor temperature", SensorDeviceClass.TEMPERATURE, None),
+    ("airflow_cfm", "airflow", None, UnitOfVolumeFlowRate.CUBIC_FEET_PER_MINUTE),
+    ("idu_modulation", "furnace modulation", None, PERCENTAGE),
+    ("filtrlvl", "filter level", None, PERCENTAGE),
+    ("humlvl", "humidifier level", None, PERCENTAGE),
+    ("ventlvl", "ventilator level", None, PERCENTAGE),
+    ("uvlvl", "UV lamp level", None, PERCENTAGE),
+    ("humid", "humidifier", None, None),
+)
+
+# Schedule and hold of each zone: snapshot field, label, device class
+ZONE_SENSORS = (
+    ("activity_current", "activity", None),
+    ("activity_scheduled", "scheduled activity", None),
+    (
+        "activity_scheduled_start",
+        "scheduled activity start",
+        SensorDeviceClass.TIMESTAMP,
+    ),
+    ("activity_next", "next activity", None),
+    ("activity_next_start", "next activity start", SensorDeviceClass.TIMESTAMP),
+    ("hold_activity", "hold activity", None),
+    ("hold_until", "hold until", None),
+)
+
+
+async def async_setup_platform(hass, config, async_add_entities, discovery_info=None):
+    """Set up the sensors of the system discovered by the climate platform"""
+    if discovery_info is None:
+        return
+    coordinator = hass.data[DOMAIN]["coordinators"][discovery_info["system_id"]]
+    async_add_entities(
+        [
+            InfinitudeRequestsSensor(coordinator),
+            InfinitudeErrorsSensor(coordinator),
+            InfinitudeUnconfirmedWritesSensor(coordinator),
+            InfinitudeLatencySensor(coordinator),
+            InfinitudeParseTimeSensor(coordinator),
+            InfinitudePayloadSizeSensor(coordinator),
+        ]
+        + [
+            InfinitudeSystemSensor(coordinator, *description)
+            for description in SYSTEM_SENSORS
+        ]
+        + [
+            InfinitudeZoneSensor(coordinator, zone_id, zone_name, *description)
+            for zone_id, zone_name in discovery_info["zones"].items()
+            for description in ZONE_SENSORS
+        ]
+    )
+
+    # Energy sensors are added once /energy.json shows which sources the
+    # system reports, which may only be after the first refresh
+    sources = set()
+
+    @callback
+    def _async_add_energy_sensors():
+        energy = coordinator.data.energy if coordinator.data is not None else None
+        if energy is None:
+            return
+        added = [source for source in energy.sources if source not in sources]
+        if added:
+            sources.update(added)
+            async_add_entities(
+                [
+                    InfinitudeEnergySensor(coordinator, source, energy.used(source))
+                    for source in added
+                ]
+            )
+
+    _async_add_energy_sensors()
+    coordinator.async_add_listener(_async_add_energy_sensors)
+
+
+class InfinitudeMetricsSensor(SensorEntity):
+    """Diagnostic sensor reading the request metrics of an Infinitude client"""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    # The per-path breakdowns change on every poll, and are only of interest live
+    _unrecorded_attributes = frozenset({MATCH_ALL})
+    key = None
+    label = None
+
+    def __init__(self, coordinator):
+        self.coordinator = coordinator
+        self.metrics = coordinator.infinitude.metrics
+        self._attr_name = "{} {}".format(coordinator.system_name, self.label)
+        self._attr_unique_id = "{}_{}".format(coordinator.system_id, self.key)
+
+
+class InfinitudeRequestsSensor(InfinitudeMetricsSensor):
+    key = "requests"
+    label = "requests"
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    @property
+    def native_value(self):
+        return self.metrics.request_count
+
+    @property
+    def extra_state_attributes(self):
+        """Counts, errors and latency histogram of each method and path"""
+        return self.metrics.as_dict()["requests"]
+
+
+class InfinitudeErrorsSensor(InfinitudeMetricsSensor):
+    key = "request_errors"
+    label = "request errors"
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    @property
+    def native_value(self):
+        return self.metrics.error_count
+
+
+class InfinitudeUnconfirmedWritesSensor(InfinitudeMetricsSensor):
+    """Changes Infinitude did not show within the confirmation timeout"""
+
+    key = "unconfirmed_writes"
+    label = "unconfirmed writes"
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    @property
+    def native_value(self):
+        return self.metrics.unconfirmed_writes
+
+
+class InfinitudeLatencySensor(InfinitudeMetricsSensor):
+    """Latency of the last status request, which is made on every poll"""
+
+    key = "status_latency"
+    label = "status latency"
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    @property
+    def native_value(self):
+        metrics = self.metrics.requests.get(("GET", "/api/status"))
+        if metrics is None or metrics.last_time is None:
+            return None
+        return round(metrics.last_time * 1000, 1)
+
+
+class InfinitudeParseTimeSensor(InfinitudeMetricsSensor):
+    key = "parse_time"
+    label = "parse time"
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    @property
+    def native_value(self):
+        if self.metrics.parse_last_time is None:
+            return None
+        return round(self.metrics.parse_last_time * 1000, 2)
+
+    @property
+    def extra_state_attributes(self):
+        return self.metrics.as_dict()["parse"]
+
+
+class InfinitudePayloadSizeSensor(InfinitudeMetricsSensor):
+    """Size of the last response of each endpoint polled"""
+
+    key = "payload_size"
+    label = "payload size"
+    _attr_native_unit_of_measurement = UnitOfInformation.BYTES
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    @property
+    def native_value(self):
+        return sum(
+            metrics.size or 0
+            for (method, _), metrics in self.metrics.requests.items()
+            if method == "GET"
+        )
+
+    @property
+    def extra_state_attributes(self):
+        return {
+            path: metrics.size
+            for (method, path), metrics in self.metrics.requests.items()
+            if method == "GET"
+        }
+
+
+class InfinitudeEnergySensor(CoordinatorEntity, RestoreSensor):
+    """Energy used by one source of the system, accumulated from the
+    increases of its daily usage so that it never resets"""
+
+    _attr_device_class = SensorDeviceClass.ENERGY
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
+
+    def __init__(self, coordinator, source, used=True):
+        """Sources without any usage reported, such as gas on a heat pump
+        system, are disabled until enabled by the user"""
+        super().__init__(coordinator)
+        self.source = source
+        self._attr_entity_registry_enabled_default = used
+        self._attr_name = "{} energy {}".format(coordinator.system_name, source)
+        self._attr_unique_id = "{}_energy_{}".format(coordinator.system_id, source)
+        self._attr_native_value = 0
+        # Usage table the total was last accumulated from
+        self._energy = None
+
+    async def async_added_to_hass(self):
+        await super().async_added_to_hass()
+        last = await self.async_get_last_sensor_data()
+        if last is not None and last.native_value is not None:
+            self._attr_native_value = int(last.native_value)
+        if self.coordinator.data is not None:
+            self._energy = self.coordinator.data.energy
+
+    @callback
+    def _handle_coordinator_update(self):
+        if self.coordinator.data is None:
+            return
+        # The usage table is shared by consecutive snapshots until
+        # /energy.json is requested again
+        energy = self.coordinator.data.energy
+        if energy is self._energy:
+            return
+        previous, self._energy = self._energy, energy
+        if energy is None or previous is None:
+            return
+        delta = energy.delta(previous, self.source)
+        if delta:
+            self._attr_native_value += delta
+            self.async_write_ha_state()
+
+
+class InfinitudeSnapshotSensor(CoordinatorEntity, SensorEntity):
+    """Sensor reading one value of the snapshot shared by the coordinator.
+    Its state is only written when that value, the availability of the data
+    or its staleness changes."""
+
+    def __init__(self, coordinator):
+        super().__init__(coordinator)
+        self._written = None
+
+    async def async_added_to_hass(self):
+        """Populate with the values the coordinator may have fetched already"""
+        await super().async_added_to_hass()
+        if self.coordinator.data is not None:
+            self._attr_native_value = self._value()
+        self._written = self._written_values()
+
+    def _written_values(self):
+        return (
+            self._attr_native_value,
+            self.coordinator.last_update_success,
+            self.coordinator.stale_since,
+        )
+
+    @property
+    def extra_state_attributes(self):
+        """Set while the values shown were not confirmed by Infinitude"""
+        if self.coordinator.stale_since is None:
+            return None
+        return {"stale_since": self.coordinator.stale_since}
+
+    @property
+    def available(self):
+        """Unavailable until the first full refresh"""
+        return super().available and self.coordinator.data is not None
+
+    def _value(self):
+        raise NotImplementedError
+
+    @callback
+    def _handle_coordinator_update(self):
+        if self.coordinator.data is not None:
+            self._attr_native_value = self._value()
+        written = self._written_values()
+        if written == self._written:
+            return
+        self._written = written
+        self.async_write_ha_state()
+
+
+class InfinitudeSystemSensor(InfinitudeSnapshotSensor):
+    def __init__(self, coordinator, key, label, device_class, unit):
+        self.key = key
+        self._attr_name = "{} {}".format(coordinator.system_name, label)
+        self._attr_unique_id = "{}_{}".format(coordinator.system_id, key)
+        self._attr_device_class = device_class
+        self._attr_native_unit_of_measurement = unit
+        # Accessory levels and airflow are numbers, the humidifier a state
+        if device_class is not None or unit is not None:
+            self._attr_state_class = SensorStateClass.MEASUREMENT
+        else:
+            # Only declared by SensorEntity, read by _value
+            self._attr_state_class = None
+        super().__init__(coordinator)
+
+    @property
+    def native_unit_of_measurement(self):
+        if self.device_class == SensorDeviceClass.TEMPERATURE:
+            data = self.coordinator.data
+            if data is not None and data.temperature_unit == "C":
+                return UnitOfTemperature.CELSIUS
+            return UnitOfTemperature.FAHRENHEIT
+        return self._attr_native_unit_of_measurement
+
+    def _value(self):
+        value = getattr(self.coordinator.data, self.key)
+        if value is None or self._attr_state_class is None:
+            return value
+        return float(value)
+
+
+class InfinitudeZoneSensor(InfinitudeSnapshotSensor):
+    def __init__(self, coordinator, zone_id, zone_name, key, label, device_class):
+        self.zone_id = zone_id
+        self.key = key
+        self._attr_name = "{} {}".format(zone_name, label)
+        self._attr_unique_id = "{}_zone_{}_{}".format(
+            coordinator.system_id, zone_id, key
+        )
+        self._attr_device_class = device_class
+        super().__init__(coordinator)
+
+    def _value(self):
+        value = getattr(self.coordinator.data.zones[self.zone_id], self.key)
+        # Schedule times are local to the thermostat, assumed to share the
+        # time zone of Home Assistant
+        if value is not None and self.device_class == SensorDeviceClass.TIMESTAMP:
+            return value.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
+        return value
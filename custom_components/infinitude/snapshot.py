@@ -0,0 +1,209 @@
+"""
+Immutable view of an Infinitude system, parsed once per poll and shared by all zones
+"""
+from dataclasses import dataclass, field
+import datetime
+import re
+
+from .energy import EnergyUsage
+from .schedule import WeeklySchedule
+
+# Current timestamp can include a TZ offset in some systems.  It should be stripped off
+# since the timestamp is already in the local time.
+LOCAL_TIME_RE = re.compile(r"^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})([+-]\d{2}:\d{2})?$")
+
+# Raised by parsing payloads that are not shaped like Infinitude's
+PARSE_ERRORS = (KeyError, IndexError, TypeError, ValueError, AttributeError)
+
+
+def get_safe(source, key, index=0, empty_dict_as_none=True):
+    """Helper function to safely parse JSON coming from Infinitude,
+    where single values can be returned as lists"""
+    result = None
+    val = source.get(key, None)
+    if val is None:
+        result = None
+    elif index is None:
+        result = val
+    else:
+        result = val[index]
+    if empty_dict_as_none and type(result) is dict and len(result) == 0:
+        result = None
+    return result
+
+
+@dataclass(frozen=True, slots=True)
+class ZoneSnapshot:
+    id: str
+    name: str
+    current_temperature: float
+    current_humidity: float
+    conditioning: str  # idle, active_heat, active_cool, more?
+    fan_mode: str  # off, high, med, low
+    setpoint_heat: float
+    setpoint_cool: float
+    activity_current: str  # Computed - NOT the API status value
+    activity_scheduled: str
+    activity_scheduled_start: datetime.datetime
+    activity_next: str
+    activity_next_start: datetime.datetime
+    hold_state: str  # on, off
+    hold_activity: str  # home, away, sleep, wake, manual
+    hold_until: str  # HH:MM (on the quarter-hour)
+    occupancy: str  # occupied, unoccupied, motion
+    program: dict = field(repr=False)
+    schedule: WeeklySchedule = field(repr=False, compare=False)
+
+    @classmethod
+    def parse(cls, zone_status, zone_config, local_time, previous=None):
+        # These status values may be outdated if a pending
+        # manual override was submitted via the API - see below
+        setpoint_heat = float(get_safe(zone_status, "htsp"))
+        setpoint_cool = float(get_safe(zone_status, "clsp"))
+        fan_mode = get_safe(zone_status, "fan")
+        activity_current = get_safe(zone_status, "currentActivity")
+
+        # Status for setpoints and fan mode will only reflect API changes after an update/refresh cycle.
+        # But we want the frontend to immediately reflect the new value, which is also stored
+        # in the zone config.
+        #
+        # To get the true values, need to know what the current activity is.
+        # If hold_activity=manual in the zone config, we know the current activity is manual,
+        # even if the thermostat status does not yet reflect the change submitted via the API.
+        # We can override with the correct values from the zone config.
+        if get_safe(zone_config, "holdActivity") == "manual":
+            activity_manual = next(
+                (
+                    a
+                    for a in get_safe(zone_config, "activities")["activity"]
+                    if a["id"] == "manual"
+                ),
+                None,
+            )
+            if activity_manual is not None:
+                activity_current = "manual"
+                setpoint_heat = float(get_safe(activity_manual, "htsp"))
+                setpoint_cool = float(get_safe(activity_manual, "clsp"))
+                fan_mode = get_safe(activity_manual, "fan")
+
+        # The program is only compiled again when the config changes
+        program = get_safe(zone_config, "program")
+        if previous is not None and previous.program is program:
+            schedule = previous.schedule
+        else:
+            schedule = WeeklySchedule(program)
+        (
+            activity_scheduled,
+            activity_scheduled_start,
+            activity_next,
+            activity_next_start,
+        ) = schedule.lookup(local_time)
+
+        return cls(
+            id=zone_status["id"],
+            name=get_safe(zone_status, "name"),
+            current_temperature=float(get_safe(zone_status, "rt")),
+            current_humidity=float(get_safe(zone_status, "rh")),
+            conditioning=get_safe(zone_status, "zoneconditioning"),
+            fan_mode=fan_mode,
+            setpoint_heat=setpoint_heat,
+            setpoint_cool=setpoint_cool,
+            activity_current=activity_current,
+            activity_scheduled=activity_scheduled,
+            activity_scheduled_start=activity_scheduled_start,
+            activity_next=activity_next,
+            activity_next_start=activity_next_start,
+            hold_state=get_safe(zone_config, "hold"),
+            hold_activity=get_safe(zone_config, "holdActivity"),
+            hold_until=get_safe(zone_config, "otmr"),
+            # Occupancy is not always present
+            occupancy=get_safe(zone_status, "occupancy"),
+            program=program,
+            schedule=schedule,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class SystemSnapshot:
+    # Raw payloads, kept to patch and re-parse without fetching them again
+    status: dict = field(repr=False)
+    config: dict = field(repr=False)
+    energy_stats: dict = field(repr=False)
+
+    local_time: datetime.datetime
+    temperature_unit: str  # F, C
+    hvac_mode: str  # auto, heat, cool, off, fanonly
+    outdoor_temperature: str
+    airflow_cfm: float
+    idu_modulation: int
+    humid: str
+    filtrlvl: str
+    humlvl: str
+    ventlvl: str
+    uvlvl: str
+    energy: EnergyUsage
+    zones: dict  # ZoneSnapshot by zone id
+
+    @classmethod
+    def parse(cls, status, config, energy_stats, previous=None):
+        """Parse the system payloads.  Values that only depend on a payload that
+        is unchanged since the previous snapshot are reused from it."""
+        local_time = LOCAL_TIME_RE.match(get_safe(status, "localTime")).group(1)
+        local_time = datetime.datetime.strptime(local_time, "%Y-%m-%dT%H:%M:%S")
+
+        zone_configs = {z["id"]: z for z in get_safe(config, "zones")["zone"]}
+        zones = {}
+        for zone_status in get_safe(status, "zones")["zone"]:
+            # Disabled zones do not report any values
+            if get_safe(zone_status, "enabled") != "on":
+                continue
+            zone_id = zone_status["id"]
+            zones[zone_id] = ZoneSnapshot.parse(
+                zone_status,
+                zone_configs.get(zone_id),
+                local_time,
+                previous.zones.get(zone_id) if previous is not None else None,
+            )
+
+        # energy.json is not always filled
+        if previous is not None and previous.energy_stats is energy_stats:
+            energy = previous.energy
+        elif len(energy_stats) > 0:
+            energy = EnergyUsage(energy_stats)
+        else:
+            energy = None
+
+        # Only get CFM if IDU is present
+        # Only get modulating percentage if IDU type is furnacemodulating
+        idu = get_safe(status, "idu")
+        airflow_cfm = None
+        idu_modulation = None
+        if idu is not None:
+            airflow_cfm = float(get_safe(idu, "cfm"))
+            if get_safe(idu, "type") == "furnacemodulating":
+                idu_opstat = get_safe(idu, "opstat")
+                idu_modulation = int(idu_opstat) if idu_opstat.isnumeric() else 0
+
+        # Safely handle missing outdoor temperature
+        oat = get_safe(status, "oat")
+        if isinstance(oat, dict):
+            oat = None
+
+        return cls(
+            status=status,
+            config=config,
+            energy_stats=energy_stats,
+            local_time=local_time,
+            temperature_unit=get_safe(config, "cfgem"),
+            hvac_mode=get_safe(config, "mode"),
+            outdoor_temperature=oat,
+            airflow_cfm=airflow_cfm,
+            idu_modulation=idu_modulation,
+            humid=get_safe(status, "humid"),
+            filtrlvl=get_safe(status, "filtrlvl"),
+            humlvl=get_safe(status, "humlvl"),
+            ventlvl=get_safe(status, "ventlvl"),
+            uvlvl=get_safe(status, "uvlvl"),
+            energy=energy,
+            zones=zones,
+        )
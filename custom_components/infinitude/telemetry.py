@@ -0,0 +1,168 @@
+"""
+Recent readings of each zone, kept in fixed-size buffers at decreasing resolution
+"""
+from array import array
+import math
+
+# Readings sampled from each snapshot, per zone
+FIELDS = ("rt", "rh", "cfm", "idu_modulation", "oat", "conditioning")
+
+# Zone conditioning values, stored by their index
+CONDITIONING = ("idle", "active_heat", "active_cool", "active_fan")
+
+# Seconds covered by each sample of a tier, 0 keeping every snapshot.
+# Each tier holds the same number of samples, so coarser tiers go further back.
+TIERS = (0, 300, 3600)
+
+# Samples kept by each tier: 12 hours of one minute polls, 2.5 days of
+# 5 minute averages and 30 days of hourly averages
+DEFAULT_CAPACITY = 720
+
+NAN = float("nan")
+
+
+def _sample(snapshot, zone):
+    try:
+        conditioning = CONDITIONING.index(zone.conditioning)
+    except ValueError:
+        conditioning = NAN
+    oat = snapshot.outdoor_temperature
+    return (
+        zone.current_temperature,
+        zone.current_humidity,
+        snapshot.airflow_cfm,
+        snapshot.idu_modulation,
+        None if oat is None else float(oat),
+        conditioning,
+    )
+
+
+class RingBuffer:
+    """Columns of floats holding the last capacity rows, oldest overwritten first"""
+
+    __slots__ = ("capacity", "times", "columns", "size", "next")
+
+    def __init__(self, capacity, width):
+        self.capacity = capacity
+        self.times = array("d", [NAN]) * capacity
+        self.columns = [array("d", [NAN]) * capacity for _ in range(width)]
+        self.size = 0
+        self.next = 0
+
+    def append(self, timestamp, row):
+        index = self.next
+        self.times[index] = timestamp
+        for column, value in zip(self.columns, row):
+            column[index] = NAN if value is None else value
+        self.next = (index + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def oldest(self):
+        if self.size == 0:
+            return None
+        return self.times[(self.next - self.size) % self.capacity]
+
+    def window(self, start, end):
+        """Rows with a time in [start, end), oldest first"""
+        rows = []
+        for offset in range(self.size):
+            index = (self.next - self.size + offset) % self.capacity
+            timestamp = self.times[index]
+            if start <= timestamp < end:
+                rows.append((timestamp, [column[index] for column in self.columns]))
+        return rows
+
+
+class Tier:
+    """Ring buffer fed with the average of the samples over each interval.
+    Conditioning, the last field, is not a quantity and keeps its last value
+    instead."""
+
+    __slots__ = ("interval", "buffer", "bucket", "sums", "counts", "last")
+
+    def __init__(self, interval, capacity):
+        self.interval = interval
+        self.buffer = RingBuffer(capacity, len(FIELDS))
+        self.bucket = None
+        self.sums = [0.0] * len(FIELDS)
+        self.counts = [0] * len(FIELDS)
+        self.last = NAN
+
+    def add(self, timestamp, sample):
+        if self.interval == 0:
+            self.buffer.append(timestamp, sample)
+            return
+        bucket = timestamp - timestamp % self.interval
+        if self.bucket is not None and bucket != self.bucket:
+            self._close()
+        self.bucket = bucket
+        for i, value in enumerate(sample[:-1]):
+            if value is not None:
+                self.sums[i] += value
+                self.counts[i] += 1
+        self.last = sample[-1]
+
+    def _close(self):
+        row = [
+            total / count if count else NAN
+            for total, count in zip(self.sums[:-1], self.counts[:-1])
+        ]
+        row.append(self.last)
+        self.buffer.append(self.bucket, row)
+        self.sums = [0.0] * len(FIELDS)
+        self.counts = [0] * len(FIELDS)
+        self.last = NAN
+
+
+class ZoneTelemetry:
+    __slots__ = ("tiers",)
+
+    def __init__(self, capacity):
+        self.tiers = [Tier(interval, capacity) for interval in TIERS]
+
+    def add(self, timestamp, sample):
+        for tier in self.tiers:
+            tier.add(timestamp, sample)
+
+    def window(self, start, end):
+        """Rows between start and end, each from the finest tier still
+        holding that time, oldest first"""
+        segments = []
+        until = end
+        for tier in self.tiers:
+            segments.append(tier.buffer.window(start, until))
+            oldest = tier.buffer.oldest()
+            if oldest is None:
+                continue
+            if oldest <= start:
+                break
+            until = min(until, oldest)
+        return [row for segment in reversed(segments) for row in segment]
+
+
+class SystemTelemetry:
+    """Telemetry of every zone of a system.  Memory is allocated up front:
+    capacity samples per tier and per zone, of 8 bytes per field and time."""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.zones = {}
+
+    def record(self, timestamp, snapshot):
+        for zone_id, zone in snapshot.zones.items():
+            telemetry = self.zones.get(zone_id)
+            if telemetry is None:
+                telemetry = self.zones[zone_id] = ZoneTelemetry(self.capacity)
+            telemetry.add(timestamp, _sample(snapshot, zone))
+
+    def export(self, zone_id, start, end):
+        """Readings of a zone between two POSIX timestamps, by column"""
+        telemetry = self.zones.get(zone_id)
+        rows = telemetry.window(start, end) if telemetry is not None else []
+        columns = {"time": [timestamp for timestamp, _ in rows]}
+        for i, field in enumerate(FIELDS):
+            values = [None if math.isnan(row[i]) else row[i] for _, row in rows]
+            if field == "conditioning":
+                values = [None if v is None else CONDITIONING[int(v)] for v in values]
+            columns[field] = values
+        return columns
@@ -0,0 +1,106 @@
+"""
+Stand-in for an Infinitude push relay.
+
+Record the updates an Infinitude server goes through, then replay them to the
+push endpoint of the integration with their original timing.
+
+    python scripts/replay_push.py record http://infinitude:3000 uploads.jsonl
+    python scripts/replay_push.py replay uploads.jsonl \\
+        http://homeassistant:8123/api/infinitude/infinitude_3000 --token TOKEN
+
+Each line of the recording is a JSON object with the number of seconds since
+the start of the recording under 'time', and the new response of any endpoint
+that changed under 'status', 'config' or 'energy'.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import aiohttp
+
+ENDPOINTS = {
+    "status": "/api/status",
+    "config": "/api/config",
+    "energy": "/energy.json",
+}
+
+
+async def record(args):
+    """Poll Infinitude and append a line whenever an endpoint changes"""
+    previous = {}
+    start = time.monotonic()
+    async with aiohttp.ClientSession() as session:
+        with open(args.file, "a") as recording:
+            while args.duration is None or time.monotonic() - start < args.duration:
+                update = {}
+                for key, path in ENDPOINTS.items():
+                    async with session.get(args.infinitude.rstrip("/") + path) as resp:
+                        body = await resp.read()
+                    if body != previous.get(key):
+                        previous[key] = body
+                        update[key] = json.loads(body)
+                if update:
+                    update["time"] = round(time.monotonic() - start, 3)
+                    recording.write(json.dumps(update, separators=(",", ":")) + "\n")
+                    recording.flush()
+                    print("{:>10.3f}s {}".format(update["time"], sorted(update)))
+                await asyncio.sleep(args.interval)
+
+
+async def replay(args):
+    """POST every recorded update to the push endpoint at its recorded time"""
+    headers = {}
+    if args.token:
+        headers["Authorization"] = "Bearer {}".format(args.token)
+    with open(args.file) as recording:
+        updates = [json.loads(line) for line in recording if line.strip()]
+
+    start = time.monotonic()
+    async with aiohttp.ClientSession(headers=headers) as session:
+        for update in updates:
+            delay = update.pop("time", 0) / args.speed - (time.monotonic() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            sent = time.monotonic()
+            async with session.post(args.url, json=update) as resp:
+                body = await resp.text()
+            print(
+                "{:>10.3f}s {} -> {} in {:.1f} ms {}".format(
+                    sent - start,
+                    sorted(update),
+                    resp.status,
+                    (time.monotonic() - sent) * 1000,
+                    body,
+                )
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parser_record = commands.add_parser("record", help="record Infinitude updates")
+    parser_record.add_argument("infinitude", help="Infinitude base URL")
+    parser_record.add_argument("file", help="recording to append to")
+    parser_record.add_argument(
+        "--interval", type=float, default=5, help="seconds between polls"
+    )
+    parser_record.add_argument(
+        "--duration", type=float, help="seconds to record for (default: forever)"
+    )
+
+    parser_replay = commands.add_parser("replay", help="replay a recording")
+    parser_replay.add_argument("file", help="recording to replay")
+    parser_replay.add_argument("url", help="push endpoint of the integration")
+    parser_replay.add_argument("--token", help="Home Assistant long-lived token")
+    parser_replay.add_argument(
+        "--speed", type=float, default=1, help="replay speed multiplier"
+    )
+
+    args = parser.parse_args()
+    asyncio.run(record(args) if args.command == "record" else replay(args))
+
+
+if __name__ == "__main__":
+    main()
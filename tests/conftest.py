@@ -0,0 +1,27 @@
+"""Shared fixtures, built from the payloads recorded in benchmarks/fixtures"""
+import copy
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, ROOT)
+
+FIXTURES = os.path.join(ROOT, "benchmarks", "fixtures")
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name)) as fixture:
+        return json.load(fixture)
+
+
+@pytest.fixture
+def payloads():
+    """Status, config and energy in the form Infinitude.async_fetch returns"""
+    return {
+        "status": load_fixture("status.json"),
+        "config": copy.deepcopy(load_fixture("config.json")["data"]),
+        "energy": load_fixture("energy.json"),
+    }
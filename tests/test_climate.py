@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+import voluptuous as vol  # noqa: E402
+
+from custom_components.infinitude.climate import PLATFORM_SCHEMA  # noqa: E402
+
+
+def test_single_system_gets_defaults():
+    config = PLATFORM_SCHEMA({"platform": "infinitude", "host": "infinitude"})
+    assert config["port"] == 3000
+    assert config["push"] is False
+
+
+def test_top_level_options_apply_to_every_system():
+    config = PLATFORM_SCHEMA(
+        {
+            "platform": "infinitude",
+            "timeout": 20,
+            "status_interval": 30,
+            "systems": [
+                {"host": "north", "name": "North"},
+                {"host": "south", "timeout": 5},
+            ],
+        }
+    )
+    north, south = config["systems"]
+    assert north["timeout"] == 20
+    assert south["timeout"] == 5
+    assert south["status_interval"] == timedelta(seconds=30)
+    assert north["port"] == south["port"] == 3000
+
+
+def test_top_level_capture_is_rejected_with_systems():
+    with pytest.raises(vol.Invalid):
+        PLATFORM_SCHEMA(
+            {
+                "platform": "infinitude",
+                "capture": "infinitude.jsonl.gz",
+                "systems": [{"host": "north"}],
+            }
+        )
@@ -0,0 +1,225 @@
+import copy
+from datetime import timedelta
+import time
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from custom_components.infinitude.coordinator import (  # noqa: E402
+    WRITE_CONFIRMED,
+    WRITE_WINDOW,
+    WRITE_PENDING,
+    WRITE_UNCONFIRMED,
+    InfinitudeDataUpdateCoordinator,
+)
+from custom_components.infinitude.infinitude import (  # noqa: E402
+    PATH_CONFIG,
+    PATH_ENERGY,
+    PATH_STATUS,
+    Infinitude,
+    InfinitudeUnavailable,
+    WriteQueue,
+    find_config_node,
+    patch_config,
+)
+from custom_components.infinitude.telemetry import SystemTelemetry  # noqa: E402
+
+ZONE_1 = "/api/config/zones/zone/0/"
+
+
+@pytest.fixture
+def coordinator(hass, payloads):
+    coordinator = InfinitudeDataUpdateCoordinator(
+        hass, Infinitude(None, "127.0.0.1", 3000)
+    )
+    coordinator.async_set_updated_data(coordinator._parse(payloads))
+    return coordinator
+
+
+@pytest.mark.asyncio
+async def test_change_is_shown_before_it_is_written(coordinator):
+    coordinator.async_patch_config(ZONE_1, {"hold": "on"})
+    assert coordinator.data.zones["1"].hold_state == "on"
+    assert coordinator.write_states[ZONE_1] == WRITE_PENDING
+
+
+@pytest.mark.asyncio
+async def test_failed_change_is_rolled_back(coordinator, payloads):
+    coordinator.async_patch_config(ZONE_1, {"hold": "on"})
+    coordinator.async_patch_failed([ZONE_1])
+    assert coordinator.data.zones["1"].hold_state == "off"
+    assert coordinator.write_states[ZONE_1] == WRITE_UNCONFIRMED
+
+    # Later polls show Infinitude's values, not the change
+    coordinator.async_set_updated_data(coordinator._parse(dict(payloads)))
+    assert coordinator.data.zones["1"].hold_state == "off"
+
+
+@pytest.mark.asyncio
+async def test_change_refused_by_open_breaker_is_rolled_back(coordinator):
+    infinitude = coordinator.infinitude
+    infinitude.breaker.failures = infinitude.breaker.threshold
+    infinitude.breaker.opened_at = time.monotonic()
+    writes = WriteQueue(
+        infinitude,
+        delay=0,
+        on_written=coordinator.async_patch_written,
+        on_failed=coordinator.async_patch_failed,
+    )
+
+    coordinator.async_patch_config(ZONE_1, {"hold": "on"})
+    with pytest.raises(InfinitudeUnavailable):
+        await writes.async_write(ZONE_1, {"hold": "on"})
+    assert coordinator.data.zones["1"].hold_state == "off"
+    assert coordinator.write_states[ZONE_1] == WRITE_UNCONFIRMED
+
+
+class ConfirmingInfinitude(Infinitude):
+    """Serves config objects from a config holding every change POSTed"""
+
+    def __init__(self, payloads, config):
+        super().__init__(None, "127.0.0.1", 3000)
+        self.payloads = payloads
+        self.config = config
+        self.retrieved = []
+
+    async def async_config_node(self, path):
+        self.retrieved.append(path)
+        return find_config_node(self.config, path)
+
+    async def async_fetch(self):
+        self.retrieved.append(PATH_CONFIG)
+        return self.ingest(
+            {
+                PATH_STATUS: self.payloads["status"],
+                PATH_CONFIG: {"data": self.config},
+                PATH_ENERGY: self.payloads["energy"],
+            }
+        )
+
+
+@pytest.mark.asyncio
+async def test_changes_to_a_zone_are_confirmed_together(hass, payloads):
+    periods = [ZONE_1 + "program/day/1/period/{}/".format(i) for i in range(3)]
+    config = payloads["config"]
+    for path in periods:
+        config = patch_config(config, path, {"activity": "away"})
+    infinitude = ConfirmingInfinitude(payloads, config)
+    coordinator = InfinitudeDataUpdateCoordinator(hass, infinitude)
+    retrieved = infinitude.ingest(
+        {
+            PATH_STATUS: payloads["status"],
+            PATH_CONFIG: {"data": payloads["config"]},
+            PATH_ENERGY: payloads["energy"],
+        }
+    )
+    coordinator.async_set_updated_data(coordinator._parse(retrieved))
+
+    coordinator.async_patch_configs({path: {"activity": "away"} for path in periods})
+    for path in periods:
+        coordinator.async_patch_written(path)
+    await hass.async_block_till_done()
+
+    assert infinitude.retrieved == [ZONE_1]
+    assert all(coordinator.write_states[path] == WRITE_CONFIRMED for path in periods)
+
+
+async def test_change_shown_from_stored_data_is_confirmed_by_a_poll(hass, payloads):
+    config = patch_config(payloads["config"], ZONE_1, {"hold": "on"})
+    infinitude = ConfirmingInfinitude(payloads, config)
+    coordinator = InfinitudeDataUpdateCoordinator(
+        hass, infinitude, update_interval=None
+    )
+    # Restored at startup, nothing was retrieved from Infinitude yet
+    coordinator.async_set_updated_data(coordinator._parse(payloads))
+
+    coordinator.async_patch_config(ZONE_1, {"hold": "on"})
+    coordinator.async_patch_written(ZONE_1)
+    await hass.async_block_till_done()
+
+    assert infinitude.retrieved == [ZONE_1, PATH_CONFIG]
+    assert coordinator.write_states[ZONE_1] == WRITE_CONFIRMED
+    await coordinator.async_shutdown()
+
+
+async def test_telemetry_is_recorded_once_per_status(hass, payloads):
+    coordinator = InfinitudeDataUpdateCoordinator(
+        hass, Infinitude(None, "127.0.0.1", 3000), telemetry=SystemTelemetry(10)
+    )
+    coordinator.async_set_updated_data(coordinator._parse(payloads))
+    # Patching and parsing the same payloads again adds no readings
+    coordinator.async_patch_config(ZONE_1, {"hold": "on"})
+    coordinator.async_set_updated_data(coordinator._parse(payloads, force=True))
+    coordinator.async_set_updated_data(coordinator._parse(dict(payloads)))
+    assert coordinator.telemetry.zones["1"].tiers[0].buffer.size == 1
+
+    coordinator.async_set_updated_data(
+        coordinator._parse({**payloads, "status": dict(payloads["status"])})
+    )
+    assert coordinator.telemetry.zones["1"].tiers[0].buffer.size == 2
+
+
+def idle_snapshot(coordinator, payloads, outdoor_temperature="50"):
+    status = copy.deepcopy(payloads["status"])
+    status["oat"] = [outdoor_temperature]
+    for zone in status["zones"][0]["zone"]:
+        zone["zoneconditioning"] = ["idle"]
+    return coordinator._parse({**payloads, "status": status})
+
+
+@pytest.fixture
+def polled(hass):
+    return InfinitudeDataUpdateCoordinator(
+        hass,
+        Infinitude(None, "127.0.0.1", 3000),
+        update_interval=timedelta(seconds=60),
+        min_interval=timedelta(seconds=15),
+        max_interval=timedelta(minutes=5),
+    )
+
+
+async def test_interval_backs_off_while_idle(polled, payloads):
+    data = idle_snapshot(polled, payloads)
+    polled._adapt_interval(data, None)
+    assert polled.update_interval == timedelta(seconds=60)
+    polled._adapt_interval(data, data)
+    assert polled.update_interval == timedelta(seconds=120)
+    polled._adapt_interval(data, data)
+    assert polled.update_interval == timedelta(seconds=240)
+    # Up to the upper bound
+    polled._adapt_interval(data, data)
+    assert polled.update_interval == timedelta(minutes=5)
+
+    # A change polls at the usual interval again
+    changed = idle_snapshot(polled, payloads, outdoor_temperature="51")
+    polled._adapt_interval(changed, data)
+    assert polled.update_interval == timedelta(seconds=60)
+
+
+async def test_interval_halves_while_conditioning(polled, payloads):
+    data = polled._parse(payloads)
+    polled._adapt_interval(data, data)
+    assert polled.update_interval == timedelta(seconds=30)
+
+
+async def test_interval_is_lowest_after_a_write(polled, payloads, monkeypatch):
+    data = idle_snapshot(polled, payloads)
+    polled._written_at = time.monotonic()
+    polled._adapt_interval(data, data)
+    assert polled.update_interval == timedelta(seconds=15)
+
+    # Until the write window is over
+    later = polled._written_at + WRITE_WINDOW.total_seconds() + 1
+    monkeypatch.setattr(time, "monotonic", lambda: later)
+    polled._adapt_interval(data, None)
+    assert polled.update_interval == timedelta(seconds=60)
+
+
+async def test_interval_is_not_adapted_without_polling(hass, payloads):
+    coordinator = InfinitudeDataUpdateCoordinator(
+        hass, Infinitude(None, "127.0.0.1", 3000), update_interval=None
+    )
+    data = idle_snapshot(coordinator, payloads)
+    coordinator._adapt_interval(data, data)
+    assert coordinator.update_interval is None
@@ -0,0 +1,31 @@
+from custom_components.infinitude.energy import PERIOD_TODAY, EnergyUsage
+
+
+def usage(energy_stats, **today):
+    """Copy of the usage with some sources of the current day replaced"""
+    periods = energy_stats["energy"][0]["usage"][0]["period"]
+    periods = [dict(period) for period in periods]
+    for period in periods:
+        if period["id"] == PERIOD_TODAY:
+            period.update({source: [str(value)] for source, value in today.items()})
+    return EnergyUsage({"energy": [{"usage": [{"period": periods}]}]})
+
+
+def test_sources_and_values(payloads):
+    energy = EnergyUsage(payloads["energy"])
+    assert "gas" in energy.sources
+    assert energy.value(PERIOD_TODAY, "gas") == 11
+    assert energy.value(PERIOD_TODAY, "solar") is None
+
+
+def test_used(payloads):
+    energy = EnergyUsage(payloads["energy"])
+    assert energy.used("gas")
+    assert not energy.used("looppump")
+    assert not energy.used("solar")
+
+
+def test_delta(payloads):
+    previous = usage(payloads["energy"], gas=11)
+    assert usage(payloads["energy"], gas=14).delta(previous, "gas") == 3
+    assert usage(payloads["energy"], gas=11).delta(previous, "gas") == 0
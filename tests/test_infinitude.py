@@ -0,0 +1,289 @@
+import asyncio
+
+import aiohttp
+import pytest
+
+from custom_components.infinitude import infinitude as client
+from custom_components.infinitude.infinitude import (
+    RETRY_ATTEMPTS,
+    CircuitBreaker,
+    Infinitude,
+    InfinitudeUnavailable,
+    WriteQueue,
+    find_config_node,
+    patch_config,
+)
+
+ZONE_1 = "/api/config/zones/zone/0/"
+ZONE_2 = "/api/config/zones/zone/1/"
+
+
+def test_patch_config_applies_change(payloads):
+    config = payloads["config"]
+    patched = patch_config(config, ZONE_1, {"hold": "on", "otmr": ""})
+    assert find_config_node(patched, ZONE_1)["hold"] == ["on"]
+    # Infinitude returns empty values as empty objects
+    assert find_config_node(patched, ZONE_1)["otmr"] == [{}]
+    # The original is left as it was
+    assert find_config_node(config, ZONE_1)["hold"] == ["off"]
+
+
+def test_patch_config_shares_unchanged_objects(payloads):
+    config = payloads["config"]
+    patched = patch_config(config, ZONE_1, {"hold": "on"})
+    assert patched["mode"] is config["mode"]
+    assert find_config_node(patched, ZONE_2) is find_config_node(config, ZONE_2)
+
+
+def test_patch_config_nested_list_path(payloads):
+    path = ZONE_1 + "program/day/1/period/2/"
+    patched = patch_config(payloads["config"], path, {"time": "18:15"})
+    assert find_config_node(patched, path)["time"] == ["18:15"]
+    assert find_config_node(patched, path)["activity"] == (
+        find_config_node(payloads["config"], path)["activity"]
+    )
+
+
+def test_find_config_node_missing_path(payloads):
+    assert find_config_node(payloads["config"], "/api/config/zones/zone/9/") is None
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(client.time, "monotonic", clock)
+    return clock
+
+
+def test_breaker_opens_after_threshold(clock):
+    breaker = CircuitBreaker(threshold=3, cooldown=60)
+    for _ in range(2):
+        breaker.failure()
+        breaker.check()
+    breaker.failure()
+    assert breaker.is_open
+    with pytest.raises(InfinitudeUnavailable):
+        breaker.check()
+
+
+def test_breaker_success_resets_failures(clock):
+    breaker = CircuitBreaker(threshold=3, cooldown=60)
+    breaker.failure()
+    breaker.failure()
+    breaker.success()
+    breaker.failure()
+    assert not breaker.is_open
+
+
+def test_breaker_allows_single_probe_after_cooldown(clock):
+    breaker = CircuitBreaker(threshold=1, cooldown=60)
+    breaker.failure()
+    clock.now += 61
+    breaker.check()
+    # Only one request is let through while the probe is in flight
+    with pytest.raises(InfinitudeUnavailable):
+        breaker.check()
+    breaker.success()
+    assert not breaker.is_open
+    breaker.check()
+
+
+def test_breaker_failed_probe_reopens(clock):
+    breaker = CircuitBreaker(threshold=1, cooldown=60)
+    breaker.failure()
+    clock.now += 61
+    breaker.check()
+    breaker.failure()
+    assert breaker.is_open
+    with pytest.raises(InfinitudeUnavailable):
+        breaker.check()
+
+
+class FlakyInfinitude(Infinitude):
+    """Answers with the outcomes given in turn, an exception or a body"""
+
+    def __init__(self, outcomes):
+        super().__init__(None, "127.0.0.1", 3000)
+        self.outcomes = list(outcomes)
+        self.sent = 0
+
+    async def _request_once(self, path, req_data):
+        self.sent += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Backoff delays, without jitter or waiting"""
+    sleeps = []
+
+    async def sleep(delay):
+        sleeps.append(delay)
+
+    monkeypatch.setattr(client.random, "uniform", lambda low, high: 1.0)
+    monkeypatch.setattr(client.asyncio, "sleep", sleep)
+    return sleeps
+
+
+def test_get_is_retried_with_backoff(sleeps):
+    infinitude = FlakyInfinitude([aiohttp.ClientConnectionError(), b"{}"])
+    assert asyncio.run(infinitude.request("/api/status")) == b"{}"
+    assert sleeps == [0.5]
+    assert infinitude.breaker.failures == 0
+
+
+def test_get_fails_after_every_attempt(sleeps):
+    infinitude = FlakyInfinitude([asyncio.TimeoutError()] * RETRY_ATTEMPTS)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(infinitude.request("/api/status"))
+    assert infinitude.sent == RETRY_ATTEMPTS
+    assert sleeps == [0.5, 1.0]
+    # The whole request counts as a single failure
+    assert infinitude.breaker.failures == 1
+
+
+def test_get_without_retry(sleeps):
+    infinitude = FlakyInfinitude([asyncio.TimeoutError()])
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(infinitude.request("/api/status", retry=False))
+    assert infinitude.sent == 1
+    assert sleeps == []
+
+
+def test_post_is_not_retried(sleeps):
+    infinitude = FlakyInfinitude([aiohttp.ClientConnectionError()])
+    with pytest.raises(aiohttp.ClientConnectionError):
+        asyncio.run(infinitude.request("/api/config/mode", {"mode": "heat"}))
+    assert infinitude.sent == 1
+
+
+def test_client_error_is_not_retried(sleeps):
+    error = aiohttp.ClientResponseError(None, (), status=404)
+    infinitude = FlakyInfinitude([error])
+    with pytest.raises(aiohttp.ClientResponseError):
+        asyncio.run(infinitude.request("/api/status"))
+    assert infinitude.sent == 1
+    assert infinitude.breaker.failures == 0
+
+
+def test_open_breaker_sends_nothing(clock):
+    infinitude = FlakyInfinitude([])
+    infinitude.breaker.failures = infinitude.breaker.threshold
+    infinitude.breaker.opened_at = clock.now
+    with pytest.raises(InfinitudeUnavailable):
+        asyncio.run(infinitude.request("/api/status"))
+    assert infinitude.sent == 0
+
+
+def test_cancelled_probe_lets_another_through(clock):
+    infinitude = FlakyInfinitude([asyncio.CancelledError(), b"{}"])
+    infinitude.breaker.failures = infinitude.breaker.threshold
+    infinitude.breaker.opened_at = clock.now
+    clock.now += infinitude.breaker.cooldown + 1
+
+    async def run():
+        with pytest.raises(asyncio.CancelledError):
+            await infinitude.request("/api/status")
+        return await infinitude.request("/api/status")
+
+    assert asyncio.run(run()) == b"{}"
+    assert not infinitude.breaker.is_open
+
+
+class FakeInfinitude:
+    """Records POSTs, failing those to the paths in fail"""
+
+    profiler = None
+
+    def __init__(self, fail=(), delays=None):
+        self.fail = set(fail)
+        self.delays = delays or {}
+        self.posted = []
+
+    async def api(self, path, data):
+        await asyncio.sleep(self.delays.get(data.get("htsp"), 0))
+        if path in self.fail:
+            raise InfinitudeUnavailable("down")
+        self.posted.append((path, dict(data)))
+
+
+def test_write_queue_coalesces_changes():
+    async def run():
+        infinitude = FakeInfinitude()
+        queue = WriteQueue(infinitude, delay=0.01)
+        queue.queue(ZONE_1, {"htsp": 70})
+        queue.queue(ZONE_2, {"hold": "on"})
+        await queue.async_write(ZONE_1, {"htsp": 72, "clsp": 76})
+        return infinitude.posted
+
+    assert asyncio.run(run()) == [
+        (ZONE_1, {"htsp": 72, "clsp": 76}),
+        (ZONE_2, {"hold": "on"}),
+    ]
+
+
+def test_write_queue_keeps_order_of_overlapping_flushes():
+    async def run():
+        # The first POST is still in flight when the second flush starts
+        infinitude = FakeInfinitude(delays={70: 0.1})
+        queue = WriteQueue(infinitude, delay=0.01)
+        first = asyncio.ensure_future(queue.async_write(ZONE_1, {"htsp": 70}))
+        await asyncio.sleep(0.03)
+        await asyncio.gather(first, queue.async_write(ZONE_1, {"htsp": 72}))
+        return [data["htsp"] for _, data in infinitude.posted]
+
+    assert asyncio.run(run()) == [70, 72]
+
+
+def test_write_queue_reports_failed_and_unsent_paths():
+    async def run():
+        failed = []
+        written = []
+        infinitude = FakeInfinitude(fail={ZONE_1})
+        queue = WriteQueue(
+            infinitude, delay=0.01, on_written=written.append, on_failed=failed.extend
+        )
+        queue.queue(ZONE_1, {"hold": "on"})
+        with pytest.raises(InfinitudeUnavailable):
+            await queue.async_write(ZONE_2, {"hold": "on"})
+        return failed, written, infinitude.posted
+
+    failed, written, posted = asyncio.run(run())
+    assert failed == [ZONE_1, ZONE_2]
+    assert written == []
+    assert posted == []
+
+
+class FailingOnce(FakeInfinitude):
+    async def api(self, path, data):
+        try:
+            await super().api(path, data)
+        finally:
+            self.fail.discard(path)
+
+
+def test_write_queue_does_not_report_paths_queued_again():
+    async def run():
+        failed = []
+        infinitude = FailingOnce(fail={ZONE_1}, delays={70: 0.05})
+        queue = WriteQueue(infinitude, delay=0.01, on_failed=failed.extend)
+        first = asyncio.ensure_future(queue.async_write(ZONE_1, {"htsp": 70}))
+        await asyncio.sleep(0.03)
+        # A newer change to the path is waiting for the next flush
+        queue.queue(ZONE_1, {"htsp": 71})
+        with pytest.raises(InfinitudeUnavailable):
+            await first
+        return failed
+
+    assert asyncio.run(run()) == []
@@ -0,0 +1,62 @@
+import asyncio
+import os
+import tracemalloc
+
+from custom_components.infinitude.profiler import INTEGRATION_DIR, CycleProfiler
+from custom_components.infinitude.snapshot import SystemSnapshot
+
+
+def profile(payloads, polls, cycles=2, timeout=60):
+    """Run polls, as (system_id, parses) pairs, through a profiler"""
+
+    async def run():
+        done = asyncio.get_running_loop().create_future()
+        profiler = CycleProfiler(["a", "b"], cycles, done.set_result, timeout)
+        for system_id, parses in polls:
+            with profiler.section("poll", system_id):
+                snapshots = [
+                    SystemSnapshot.parse(
+                        payloads["status"], payloads["config"], payloads["energy"]
+                    )
+                    for _ in range(parses)
+                ]
+            with profiler.section("write"):
+                pass
+            del snapshots
+        return await asyncio.wait_for(done, timeout + 1)
+
+    return asyncio.run(run())
+
+
+def test_done_once_every_system_was_polled(payloads):
+    profiler = profile(payloads, [("a", 1), ("a", 1), ("b", 1), ("b", 1)])
+    assert profiler.done
+    assert profiler.counts["poll"] == 4
+    # The write after the last poll came once profiling was done
+    assert profiler.counts["write"] == 3
+    assert not tracemalloc.is_tracing()
+
+
+def test_done_after_timeout(payloads):
+    profiler = profile(payloads, [("a", 1)], timeout=0.01)
+    assert profiler.done
+    assert profiler.polls == {"a": 1}
+
+
+def test_allocations_are_charged_to_the_integration(payloads):
+    profiler = profile(payloads, [("a", 1), ("a", 1), ("b", 1), ("b", 1)])
+    sites = profiler.allocation_sites()
+    assert sites
+    assert all(filename.startswith(INTEGRATION_DIR) for (filename, _), _ in sites)
+    assert not any(filename.endswith("profiler.py") for (filename, _), _ in sites)
+    assert "Profiled 4 polls and 3 writes" in profiler.report()
+
+
+def test_write_next_to_the_report(payloads, tmp_path):
+    profiler = profile(payloads, [("a", 1), ("a", 1), ("b", 1), ("b", 1)])
+    directory = tmp_path / ".homeassistant"
+    directory.mkdir()
+    profiler.write(str(directory / "profile"))
+    assert sorted(os.listdir(directory)) == ["profile", "profile.prof"]
+    profiler.write(str(directory / "profile.txt"))
+    assert "profile.txt" in os.listdir(directory)
@@ -0,0 +1,75 @@
+import copy
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from homeassistant.setup import async_setup_component  # noqa: E402
+
+from custom_components.infinitude.coordinator import (  # noqa: E402
+    InfinitudeDataUpdateCoordinator,
+)
+from custom_components.infinitude.infinitude import (  # noqa: E402
+    PATH_STATUS,
+    Infinitude,
+)
+from custom_components.infinitude.push import async_register_push  # noqa: E402
+
+
+@pytest.fixture
+async def coordinator(hass):
+    assert await async_setup_component(hass, "http", {})
+    coordinator = InfinitudeDataUpdateCoordinator(
+        hass, Infinitude(None, "127.0.0.1", 3000), update_interval=None
+    )
+    async_register_push(hass, coordinator)
+    return coordinator
+
+
+@pytest.fixture
+def unknown_zone(payloads):
+    """A status listing a zone the config does not have"""
+    status = copy.deepcopy(payloads["status"])
+    status["zones"][0]["zone"][0]["id"] = "9"
+    return status
+
+
+async def test_full_update_is_parsed(hass, hass_client, coordinator, payloads):
+    client = await hass_client()
+    url = "/api/infinitude/{}".format(coordinator.system_id)
+
+    response = await client.post(url, json={"status": payloads["status"]})
+    assert response.status == 202
+    response = await client.post(
+        url,
+        json={"config": {"data": payloads["config"]}, "energy": payloads["energy"]},
+    )
+    assert response.status == 200
+    assert set(coordinator.data.zones) == {str(i) for i in range(1, 9)}
+
+
+async def test_malformed_update_is_rejected(
+    hass, hass_client, coordinator, payloads, unknown_zone
+):
+    client = await hass_client()
+    url = "/api/infinitude/{}".format(coordinator.system_id)
+    full = {
+        "status": payloads["status"],
+        "config": {"data": payloads["config"]},
+        "energy": payloads["energy"],
+    }
+    assert (await client.post(url, json=full)).status == 200
+    snapshot = coordinator.data
+
+    response = await client.post(url, json={"status": unknown_zone})
+    assert response.status == 400
+    # The last good update is kept
+    assert coordinator.infinitude.data["status"] == payloads["status"]
+    assert coordinator.data is snapshot
+    assert coordinator.async_push({PATH_STATUS: payloads["status"]})
+
+
+async def test_unknown_system(hass, hass_client, coordinator):
+    client = await hass_client()
+    response = await client.post("/api/infinitude/unknown", json={})
+    assert response.status == 404
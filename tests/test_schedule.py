@@ -0,0 +1,139 @@
+import datetime
+
+import pytest
+
+from custom_components.infinitude.schedule import DAYS, WeeklySchedule, program_changes
+
+MONDAY = 1
+
+
+def periods(program, day):
+    return [
+        {
+            "time": period["time"][0],
+            "activity": period["activity"][0],
+            "enabled": period["enabled"][0] == "on",
+        }
+        for period in program["day"][day]["period"]
+    ]
+
+
+@pytest.fixture
+def program(payloads):
+    return payloads["config"]["zones"][0]["zone"][0]["program"][0]
+
+
+def test_unchanged_program_has_no_changes(program):
+    week = {day["id"]: periods(program, i) for i, day in enumerate(program["day"])}
+    assert program_changes(program, week) == {}
+
+
+def test_only_changed_fields_are_written(program):
+    monday = periods(program, MONDAY)
+    monday[1]["time"] = "09:00"
+    monday[2]["activity"] = "away"
+    assert program_changes(program, {"Monday": monday}) == {
+        (MONDAY, 1): {"time": "09:00"},
+        (MONDAY, 2): {"activity": "away"},
+    }
+
+
+def test_periods_not_given_are_disabled(program):
+    monday = periods(program, MONDAY)[:2]
+    changes = program_changes(program, {"Monday": monday})
+    assert changes == {
+        (MONDAY, index): {"enabled": "off"}
+        for index, period in enumerate(program["day"][MONDAY]["period"])
+        if index >= 2 and period["enabled"][0] == "on"
+    }
+
+
+def test_days_not_given_are_left_alone(program):
+    assert program_changes(program, {}) == {}
+
+
+def test_too_many_periods(program):
+    monday = periods(program, MONDAY)
+    monday.append(dict(monday[-1]))
+    with pytest.raises(ValueError):
+        program_changes(program, {"Monday": monday})
+
+
+def test_periods_out_of_order(program):
+    monday = periods(program, MONDAY)
+    monday[0], monday[1] = monday[1], monday[0]
+    with pytest.raises(ValueError):
+        program_changes(program, {"Monday": monday})
+
+
+def make_program(enabled_days, times=("06:00", "08:00", "17:00", "23:45")):
+    """Periods at the same times every day, only enabled on some days"""
+    activities = ("wake", "away", "home", "sleep")
+    return {
+        "day": [
+            {
+                "id": day,
+                "period": [
+                    {
+                        "activity": [activity],
+                        "time": [time],
+                        "enabled": ["on" if day in enabled_days else "off"],
+                    }
+                    for time, activity in zip(times, activities)
+                ],
+            }
+            for day in DAYS
+        ]
+    }
+
+
+def at(day, hour, minute=0):
+    """Local time in the week of Monday 1 January 2024"""
+    return datetime.datetime(2024, 1, day, hour, minute)
+
+
+def test_lookup_within_a_day():
+    schedule = WeeklySchedule(make_program(DAYS))
+    assert schedule.lookup(at(1, 7)) == ("wake", at(1, 6), "away", at(1, 8))
+
+
+def test_lookup_at_the_start_of_a_period():
+    # A period only applies once it has started, strictly before
+    schedule = WeeklySchedule(make_program(DAYS))
+    assert schedule.lookup(at(1, 8)) == ("wake", at(1, 6), "away", at(1, 8))
+
+
+def test_lookup_wraps_to_the_previous_week():
+    schedule = WeeklySchedule(make_program(DAYS))
+    assert schedule.lookup(at(1, 5)) == (
+        "sleep",
+        datetime.datetime(2023, 12, 31, 23, 45),
+        "wake",
+        at(1, 6),
+    )
+
+
+def test_lookup_wraps_to_the_next_week():
+    schedule = WeeklySchedule(make_program(DAYS))
+    assert schedule.lookup(at(7, 23, 50)) == ("sleep", at(7, 23, 45), "wake", at(8, 6))
+
+
+def test_lookup_skips_disabled_days():
+    schedule = WeeklySchedule(make_program(["Wednesday"]))
+    assert schedule.lookup(at(5, 12)) == ("sleep", at(3, 23, 45), "wake", at(10, 6))
+    assert schedule.lookup(at(1, 12)) == (
+        "sleep",
+        datetime.datetime(2023, 12, 27, 23, 45),
+        "wake",
+        at(3, 6),
+    )
+
+
+def test_lookup_single_period():
+    schedule = WeeklySchedule(make_program(["Tuesday"], times=("09:00",)))
+    assert schedule.lookup(at(2, 10)) == ("wake", at(2, 9), "wake", at(9, 9))
+
+
+def test_lookup_without_enabled_periods():
+    assert WeeklySchedule(make_program([])).lookup(at(1, 12)) == (None,) * 4
+    assert WeeklySchedule({"day": []}).lookup(at(1, 12)) == (None,) * 4
@@ -0,0 +1,57 @@
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from homeassistant.helpers.discovery import async_load_platform  # noqa: E402
+
+from custom_components.infinitude.const import DOMAIN  # noqa: E402
+from custom_components.infinitude.coordinator import (  # noqa: E402
+    InfinitudeDataUpdateCoordinator,
+)
+from custom_components.infinitude.infinitude import Infinitude  # noqa: E402
+from custom_components.infinitude.sensor import (  # noqa: E402
+    SYSTEM_SENSORS,
+    ZONE_SENSORS,
+)
+
+ZONE_1 = "/api/config/zones/zone/0/"
+
+
+@pytest.fixture
+async def coordinator(hass, enable_custom_integrations, payloads):
+    """A system set up the way the climate platform does"""
+    coordinator = InfinitudeDataUpdateCoordinator(
+        hass,
+        Infinitude(None, "127.0.0.1", 3000),
+        update_interval=None,
+        system_name="Infinitude",
+    )
+    coordinator.async_set_updated_data(coordinator._parse(payloads))
+    hass.data[DOMAIN] = {"coordinators": {coordinator.system_id: coordinator}}
+    await async_load_platform(
+        hass,
+        "sensor",
+        DOMAIN,
+        {
+            "system_id": coordinator.system_id,
+            "zones": {"1": "Living room"},
+            "occupancy": [],
+        },
+        {},
+    )
+    await hass.async_block_till_done()
+    return coordinator
+
+
+async def test_sensors_are_added(hass, coordinator):
+    sensors = hass.states.async_entity_ids("sensor")
+    # Metrics, system, zone and energy sensors
+    assert len(sensors) >= 6 + len(SYSTEM_SENSORS) + len(ZONE_SENSORS)
+    assert hass.states.get("sensor.infinitude_humidifier") is not None
+    assert hass.states.get("sensor.living_room_activity") is not None
+
+
+async def test_sensors_follow_changes(hass, coordinator):
+    coordinator.async_patch_config(ZONE_1, {"hold": "on", "holdActivity": "away"})
+    await hass.async_block_till_done()
+    assert hass.states.get("sensor.living_room_hold_activity").state == "away"
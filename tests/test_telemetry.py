@@ -0,0 +1,79 @@
+import math
+
+from custom_components.infinitude.snapshot import SystemSnapshot
+from custom_components.infinitude.telemetry import (
+    FIELDS,
+    RingBuffer,
+    SystemTelemetry,
+    Tier,
+    ZoneTelemetry,
+)
+
+
+def sample(rt, conditioning=0):
+    return (rt, 40.0, 500.0, None, 30.0, conditioning)
+
+
+def test_ring_buffer_overwrites_oldest():
+    buffer = RingBuffer(3, 1)
+    for t in range(5):
+        buffer.append(float(t), (t * 10,))
+    assert buffer.size == 3
+    assert buffer.oldest() == 2.0
+    assert buffer.window(0, 10) == [(2.0, [20.0]), (3.0, [30.0]), (4.0, [40.0])]
+
+
+def test_ring_buffer_window_bounds():
+    buffer = RingBuffer(4, 1)
+    for t in range(4):
+        buffer.append(float(t), (None,))
+    # The start is included, the end is not
+    assert [t for t, _ in buffer.window(1, 3)] == [1.0, 2.0]
+    assert math.isnan(buffer.window(0, 1)[0][1][0])
+
+
+def test_empty_ring_buffer():
+    buffer = RingBuffer(4, 1)
+    assert buffer.oldest() is None
+    assert buffer.window(0, 10) == []
+
+
+def test_tier_averages_each_interval():
+    tier = Tier(300, 10)
+    tier.add(0, sample(70.0, 1))
+    tier.add(100, sample(72.0, 0))
+    # Nothing is stored until the interval is over
+    assert tier.buffer.size == 0
+    tier.add(300, sample(75.0))
+    [(timestamp, row)] = tier.buffer.window(0, 1000)
+    assert timestamp == 0
+    assert row[0] == 71.0
+    # Missing readings are left out of the average
+    assert math.isnan(row[FIELDS.index("idu_modulation")])
+    # Conditioning keeps its last value
+    assert row[-1] == 0
+
+
+def test_zone_window_uses_finest_tier_available():
+    telemetry = ZoneTelemetry(3)
+    for minute in range(10):
+        telemetry.add(minute * 60.0, sample(float(minute)))
+    rows = telemetry.window(0, 600)
+    times = [timestamp for timestamp, _ in rows]
+    # The 3 last snapshots, preceded by the averages of the 5 minutes before
+    assert times == [0.0, 420.0, 480.0, 540.0]
+    assert rows[0][1][0] == 2.0
+
+
+def test_export_by_column(payloads):
+    snapshot = SystemSnapshot.parse(
+        payloads["status"], payloads["config"], payloads["energy"]
+    )
+    telemetry = SystemTelemetry(10)
+    telemetry.record(100.0, snapshot)
+    zone_id = next(iter(snapshot.zones))
+    export = telemetry.export(zone_id, 0, 200)
+    assert export["time"] == [100.0]
+    assert export["rt"] == [snapshot.zones[zone_id].current_temperature]
+    assert export["conditioning"] == [snapshot.zones[zone_id].conditioning]
+    assert telemetry.export("unknown", 0, 200)["time"] == []